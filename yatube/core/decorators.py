@@ -0,0 +1,10 @@
+def query_budget(max_queries):
+    """Объявляет, сколько SQL-запросов может выполнить view.
+
+    Бюджет проверяет QueryBudgetMiddleware в работе и тесты
+    с помощью posts.tests.utils.QueryBudgetMixin.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
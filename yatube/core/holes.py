@@ -0,0 +1,56 @@
+"""Пользовательские фрагменты общих закэшированных страниц.
+
+Страница, которую видят все посетители одинаково, кэшируется одной
+копией на адрес. Части, зависящие от посетителя (шапка с входом и
+выходом, кнопка подписки, вкладки ленты), при такой отрисовке
+заменяются метками <!--hole:имя:аргумент-->, а перед отдачей ответа
+fill() подставляет на их место фрагменты для текущего пользователя.
+"""
+import re
+from urllib.parse import quote, unquote
+
+from django.template.loader import render_to_string
+
+MARKER = '<!--hole:{name}:{arg}-->'
+MARKER_PATTERN = re.compile(r'<!--hole:(\w+):([^>]*)-->')
+
+renderers = {}
+
+
+def register(name):
+    """Регистрирует функцию render(request, arg, context) для дыры name.
+
+    context - контекст шаблона при обычной отрисовке, из него можно
+    взять уже посчитанные значения; при заполнении из кэша он None.
+    """
+    def decorator(render):
+        renderers[name] = render
+        return render
+    return decorator
+
+
+def is_shared(request):
+    return getattr(request, 'shared_render', False)
+
+
+def marker(name, arg=''):
+    return MARKER.format(name=name, arg=quote(str(arg)))
+
+
+def render_hole(request, name, arg='', context=None):
+    return renderers[name](request, arg, context)
+
+
+def fill(request, content):
+    """Подставляет фрагменты текущего пользователя на место меток"""
+    return MARKER_PATTERN.sub(
+        lambda match: render_hole(
+            request, match.group(1), unquote(match.group(2))
+        ),
+        content
+    )
+
+
+@register('header')
+def header(request, arg, context):
+    return render_to_string('includes/header.html', request=request)
@@ -0,0 +1,144 @@
+import mimetypes
+import os
+import re
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Год: имена миниатюр sorl - хеш от исходника и опций, файл не меняется
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class RangeFile:
+    """Файл, из которого читается не больше length байт с позиции start.
+
+    Нужен ответам 206: у такого объекта нет fileno(), поэтому сервер
+    не отдаст через sendfile лишние байты после конца диапазона.
+    """
+
+    def __init__(self, file_, start, length):
+        self.file = file_
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """(start, length) для заголовка Range с одним диапазоном.
+
+    None - заголовка нет или он не разобран: отдается весь файл.
+    ValueError - диапазон за пределами файла (ответ 416).
+    """
+    match = RANGE_HEADER.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-500: последние 500 байт
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def cache_control(path):
+    for prefix in settings.MEDIA_IMMUTABLE_PREFIXES:
+        if path.startswith(prefix):
+            return IMMUTABLE_CACHE_CONTROL
+    return f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def offload_response(path, full_path):
+    """Пустой ответ, тело которого отдает веб-сервер"""
+    response = HttpResponse()
+    if settings.MEDIA_SERVE_MODE == 'x-accel':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + path
+    else:
+        response['X-Sendfile'] = full_path
+    # Тип ставит веб-сервер по расширению файла
+    del response['Content-Type']
+    return response
+
+
+def file_response(request, full_path, size):
+    """Ответ с файлом: целиком через wsgi.file_wrapper или диапазоном"""
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(
+            status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if request.method == 'HEAD':
+        response = HttpResponse()
+        response['Content-Length'] = size
+    elif byte_range is None:
+        # Настоящий файл: WSGI-сервер отдает его через sendfile
+        response = FileResponse(open(full_path, 'rb'))
+    else:
+        start, length = byte_range
+        response = FileResponse(
+            RangeFile(open(full_path, 'rb'), start, length),
+            status=HTTPStatus.PARTIAL_CONTENT
+        )
+        response['Content-Length'] = length
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}'
+        )
+    content_type, _ = mimetypes.guess_type(full_path)
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдает файл из MEDIA_ROOT с заголовками кэширования.
+
+    Режим MEDIA_SERVE_MODE: sendfile - файл отдает WSGI-сервер без
+    копирования в Python, x-accel и x-sendfile - веб-сервер перед
+    приложением по заголовку X-Accel-Redirect или X-Sendfile.
+    ETag и Last-Modified строятся по stat() файла, поэтому на
+    повторный запрос с If-None-Match файл даже не открывается.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404(path)
+    if not os.path.isfile(full_path):
+        raise Http404(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        if settings.MEDIA_SERVE_MODE == 'sendfile':
+            response = file_response(request, full_path, stat.st_size)
+        else:
+            response = offload_response(path, full_path)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control(path)
+    return response
@@ -0,0 +1,55 @@
+import logging
+import time
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Обертка выполнения SQL, которая считает запросы и их время"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.monotonic() - started
+
+
+class QueryBudgetMiddleware:
+    """Считает SQL-запросы каждого view и пишет в лог превышения бюджета,
+    объявленного декоратором core.decorators.query_budget"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.monotonic()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = time.monotonic() - started
+        view_name = getattr(request, 'query_budget_view', None)
+        if view_name is None:
+            return response
+        budget = request.query_budget
+        logger.debug(
+            '%s: %d queries, %.1f ms in SQL, %.1f ms total',
+            view_name, counter.count, counter.duration * 1000, elapsed * 1000
+        )
+        if budget is not None and counter.count > budget:
+            logger.warning(
+                '%s exceeded its query budget: %d queries, budget %d',
+                view_name, counter.count, budget
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget_view = request.resolver_match.view_name
+        request.query_budget = getattr(view_func, 'query_budget', None)
@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core import holes
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, arg=''):
+    """Фрагмент текущего пользователя или метка для общей страницы"""
+    request = context.get('request')
+    if request is not None and holes.is_shared(request):
+        return mark_safe(holes.marker(name, arg))
+    return mark_safe(holes.render_hole(request, name, arg, context.flatten()))
@@ -1,6 +1,10 @@
+import os
+import shutil
+import tempfile
 from http import HTTPStatus
 
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
 
 
 class ViewTestClass(TestCase):
@@ -9,3 +13,79 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaServingTests(TestCase):
+    '''Проверка отдачи медиафайлов'''
+
+    content = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'cache', 'ab'))
+        for name in ('cache/ab/thumb.jpg', 'photo.jpg'):
+            with open(os.path.join(TEMP_MEDIA_ROOT, name), 'wb') as file_:
+                file_.write(cls.content)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_file_is_streamed_with_cache_headers(self):
+        '''Файл отдается целиком, миниатюры кэшируются навсегда.'''
+        response = self.client.get('/media/cache/ab/thumb.jpg')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get('/media/photo.jpg')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_if_none_match_returns_not_modified(self):
+        '''Повторный запрос с ETag получает 304 без тела.'''
+        etag = self.client.get('/media/photo.jpg')['ETag']
+        response = self.client.get(
+            '/media/photo.jpg', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_range_requests(self):
+        '''Range отдает часть файла, неверный диапазон - 416.'''
+        response = self.client.get(
+            '/media/photo.jpg', HTTP_RANGE='bytes=10-19'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(
+            b''.join(response.streaming_content), self.content[10:20]
+        )
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        response = self.client.get('/media/photo.jpg', HTTP_RANGE='bytes=-4')
+        self.assertEqual(
+            b''.join(response.streaming_content), self.content[-4:]
+        )
+        response = self.client.get(
+            '/media/photo.jpg', HTTP_RANGE='bytes=2000-'
+        )
+        self.assertEqual(
+            response.status_code, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel')
+    def test_x_accel_mode_offloads_body(self):
+        '''В режиме x-accel тело отдает nginx.'''
+        response = self.client.get('/media/photo.jpg')
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/photo.jpg'
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_path_outside_media_root(self):
+        '''Пути за пределами MEDIA_ROOT не отдаются.'''
+        response = self.client.get('/media/%2e%2e/manage.py')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
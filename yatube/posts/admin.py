@@ -1,10 +1,83 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
+from . import fulltext
 from .models import Comment, Group, Post
+from .paginators import EstimatedCountPaginator
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое подписывает выбранный объект без запроса.
+
+    В колонке list_editable виджет выводится в каждой строке, и обычный
+    AutocompleteSelect запрашивает выбранный объект для каждой. Здесь
+    берется объект preloaded, уже загруженный через list_select_related.
+    """
+
+    preloaded = None
+
+    def optgroups(self, name, value, attr=None):
+        obj = self.preloaded
+        selected = [str(item) for item in value if item]
+        if obj is None or selected != [str(obj.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        label = self.choices.field.label_from_instance(obj)
+        options.append(
+            self.create_option(name, obj.pk, label, True, len(options))
+        )
+        return [(None, options, 0)]
+
+
+class LargeTableMixin:
+    """Список изменений, который открывается быстро на больших таблицах"""
+
+    # Число записей оценивается по первичному ключу, без COUNT(*)
+    paginator = EstimatedCountPaginator
+    # Иначе под строкой поиска считается COUNT(*) всей таблицы
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', PreloadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using')
+            ))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        """Форма строки, которая отдает виджетам уже загруженные объекты"""
+        base_form = super().get_changelist_form(request, **kwargs)
+        preloaded = [
+            name for name in self.list_editable
+            if name in self.get_autocomplete_fields(request)
+        ]
+
+        class ChangeListForm(base_form):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                for name in preloaded:
+                    widget = self.fields[name].widget
+                    # Поля связей обернуты в RelatedFieldWidgetWrapper
+                    widget = getattr(widget, 'widget', widget)
+                    widget.preloaded = getattr(self.instance, name)
+
+        return ChangeListForm
+
+
+class FullTextSearchMixin:
+    """Поиск в админке по полнотекстовому индексу вместо LIKE '%...%'"""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return fulltext.matching(queryset, search_term), False
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,27 +85,41 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group'
     )
-    # Интерфейс для поиска по тексту постов
+    # Автор и группа строк приходят одним запросом с постами
+    list_select_related = ('author', 'group')
+    # Интерфейс для поиска по тексту постов (через индекс FTS5)
     search_fields = ('text',)
     # Возможность менять поле group в любом посте
     list_editable = ('group',)
-    # Возможность фильтрации по дате
+    # Поиск вместо <select> со всеми группами и пользователями,
+    # в том числе в колонке group списка
+    autocomplete_fields = ('author', 'group')
+    # Фильтр и переход по датам идут по индексу post_pub_date_idx
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     # Свойство для пустых полей по-умолчанию
     empty_value_display = '-пусто-'
 
 
-admin.site.register(Group)
+@admin.register(Group)
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('title', 'slug')
+    # Нужен для автодополнения групп в PostAdmin
+    search_fields = ('title', 'slug')
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         'post',
         'author',
         'text',
         'created'
     )
-
+    list_select_related = ('post', 'author')
     search_fields = ('text',)
-    list_filter = ('created', 'author', 'post',)
+    autocomplete_fields = ('post', 'author')
+    # Фильтры по автору и посту выводили всех пользователей и все
+    # посты; отфильтровать можно параметром ?author__id__exact=
+    list_filter = ('created',)
+    date_hierarchy = 'created'
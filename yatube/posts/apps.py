@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        # Подключаем обработчики сигналов моделей
+        from . import signals  # noqa: F401
+        # И фрагменты пользователя для общих закэшированных страниц
+        from . import holes  # noqa: F401
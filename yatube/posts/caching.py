@@ -0,0 +1,100 @@
+import hashlib
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core import holes
+
+VERSION_KEY = 'posts:version:{}'
+PAGE_KEY = 'posts:page:{}:{}'
+# Область, которая входит в ключ каждой закэшированной страницы
+GLOBAL_SCOPE = 'all'
+
+
+def index_scope():
+    return 'index'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def post_scopes(post):
+    """Области кэша, в которых показывается пост"""
+    scopes = [index_scope(), author_scope(post.author.username)]
+    if post.group_id:
+        scopes.append(group_scope(post.group.slug))
+    return scopes
+
+
+def get_versions(*scopes):
+    """Текущие поколения областей кэша; новая область начинает с 1"""
+    keys = [VERSION_KEY.format(scope) for scope in (GLOBAL_SCOPE,) + scopes]
+    versions = cache.get_many(keys)
+    return [versions.get(key, 1) for key in keys]
+
+
+def bump(*scopes):
+    """Переводит области на новое поколение, старые страницы не читаются"""
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        # Версии хранятся без срока жизни, иначе поколение обнулится
+        if not cache.add(key, 2, None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 2, None)
+
+
+def skip_page_cache(request):
+    """Страница с временной разметкой не сохраняется в кэш страниц"""
+    request.skip_page_cache = True
+
+
+def page_key(request, versions):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY.format('.'.join(map(str, versions)), path)
+
+
+def cache_listing(get_scope):
+    """Кэширует страницу, пока не сменится поколение ее области.
+
+    get_scope получает аргументы view и возвращает область кэша,
+    например group_scope(slug). Срок жизни LISTING_CACHE_TIMEOUT
+    может быть большим: свежесть обеспечивает смена поколения.
+    Страница хранится одной копией для всех посетителей, вошедших и
+    нет: пользовательские части отрисовываются метками core.holes
+    и заполняются для каждого ответа, в том числе из кэша. Страница,
+    для которой вызван skip_page_cache(), отдается, но не хранится.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            key = page_key(request, get_versions(get_scope(*args, **kwargs)))
+            content = cache.get(key)
+            if content is None:
+                request.shared_render = True
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    request.shared_render = False
+                if response.status_code != HTTPStatus.OK:
+                    return response
+                content = response.content.decode(response.charset)
+                if not getattr(request, 'skip_page_cache', False):
+                    cache.set(key, content, settings.LISTING_CACHE_TIMEOUT)
+            else:
+                response = HttpResponse()
+            response.content = holes.fill(request, content)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import caching, thumbnails
+
+CARD_KEY = 'posts:card:{variant}:{pk}:{version}:{generation}'
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+# Разметка карточки в разных списках: в группе не нужна ссылка на
+# группу, в профиле - имя автора
+VARIANTS = {
+    'index': {'show_author': True, 'show_group': True},
+    'group': {'show_author': True, 'show_group': False},
+    'profile': {'show_author': False, 'show_group': True},
+}
+
+
+def card_key(post, variant, generation):
+    """Ключ карточки; версия - время последнего сохранения поста.
+
+    generation - общее поколение кэша страниц: оно меняется, когда
+    меняются группы или имена авторов, которые есть в карточке.
+    """
+    version = int(post.updated.timestamp() * 1000000)
+    return CARD_KEY.format(
+        variant=variant, pk=post.pk, version=version, generation=generation
+    )
+
+
+def render_cards(posts, variant='index', request=None):
+    """HTML карточек постов страницы, по возможности из кэша.
+
+    Готовые карточки читаются одним get_many, миниатюры ищутся
+    только для недостающих, новые карточки пишутся одним set_many.
+    Правка поста меняет updated, поэтому старая карточка просто
+    перестает читаться, а правка группы или имени автора сменой
+    общего поколения кэша сбрасывает все карточки. Карточки с еще не
+    созданными миниатюрами не кэшируются, и страница запроса request
+    с ними тоже не попадает в кэш страниц.
+    """
+    posts = list(posts)
+    generation, = caching.get_versions()
+    keys = [card_key(post, variant, generation) for post in posts]
+    found = cache.get_many(keys)
+    missing = [post for post, key in zip(posts, keys) if key not in found]
+    thumbnails.prefetch_thumbnails(missing)
+    context = VARIANTS[variant]
+    rendered = {}
+    for post, key in zip(posts, keys):
+        if key in found:
+            continue
+        found[key] = render_to_string(CARD_TEMPLATE, {'post': post, **context})
+        if thumbnails.thumbnails_ready(post):
+            rendered[key] = found[key]
+        elif request is not None:
+            caching.skip_page_cache(request)
+    cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+    return [mark_safe(found[key]) for key in keys]
@@ -0,0 +1,52 @@
+"""ETag страниц из дешевых метаданных.
+
+ETag считается до отрисовки: по поколениям областей кэша из
+posts.caching (смена поколения означает, что страница изменилась;
+страница поста следит за областью его автора), по updated и счетчику
+комментариев поста. Совпадение с If-None-Match дает ответ 304 без
+загрузки постов и шаблонов. Страница включает шапку пользователя,
+поэтому в ETag входит и он. Last-Modified не отдается: правка и
+удаление постов и комментариев не двигают ни одну дату, и клиент с
+одним If-Modified-Since получал бы устаревшую страницу.
+"""
+import hashlib
+
+from . import caching
+from .models import Comment, Post
+
+
+def make_etag(*parts):
+    return hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def user_key(request):
+    user = request.user
+    if not user.is_authenticated:
+        return 'anonymous'
+    return f'{user.pk}:{user.username}'
+
+
+def post_etag(request, post_id):
+    """ETag поста; None, если поста нет: тогда view сам ответит 404"""
+    meta = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'comments_count', 'author__stats__posts_count',
+        'author__username'
+    ).first()
+    if meta is None:
+        return None
+    *meta, username = meta
+    latest_comment = Comment.objects.filter(
+        post_id=post_id
+    ).order_by('-created', '-pk').values_list('pk', flat=True).first()
+    # Правка текста комментария не меняет ни одно поле поста, но
+    # сменяет поколение области автора
+    versions = caching.get_versions(caching.author_scope(username))
+    return make_etag(*meta, latest_comment, *versions, user_key(request))
+
+
+def listing_etag(get_scope):
+    """ETag списка по поколению его области кэша; запросов к базе нет"""
+    def etag(request, *args, **kwargs):
+        versions = caching.get_versions(get_scope(*args, **kwargs))
+        return make_etag(*versions, user_key(request))
+    return etag
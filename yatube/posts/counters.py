@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Post, User, UserStats
+
+USER_COUNTERS = ('posts_count', 'followers_count', 'following_count')
+LISTING_COUNT_KEY = 'posts:count:{}'
+
+
+def change_user_counter(user_id, field, delta):
+    """Атомарно меняет счетчик пользователя.
+
+    Если строки счетчиков нет, ничего не делаем: расхождение исправит
+    команда reconcile_counters, а создавать строку во время удаления
+    пользователя нельзя.
+    """
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+
+
+def change_comments_count(post_id, delta):
+    """Атомарно меняет счетчик комментариев поста"""
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def cached_count(scope, queryset):
+    """Число постов списка scope, закэшированное ненадолго.
+
+    Сигналы сбрасывают значение при создании и удалении поста и при
+    переносе поста из группы в группу, срок LISTING_COUNT_TIMEOUT
+    страхует от записей в обход сигналов.
+    """
+    key = LISTING_COUNT_KEY.format(scope)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.LISTING_COUNT_TIMEOUT)
+    return count
+
+
+def forget_counts(*scopes):
+    cache.delete_many([LISTING_COUNT_KEY.format(scope) for scope in scopes])
+
+
+def count_user_stats(user_ids):
+    """Настоящие значения счетчиков для пачки пользователей"""
+    counts = {user_id: dict.fromkeys(USER_COUNTERS, 0)
+              for user_id in user_ids}
+    sources = (
+        ('posts_count', Post.objects.filter(author_id__in=user_ids),
+         'author'),
+        ('followers_count', Follow.objects.filter(author_id__in=user_ids),
+         'author'),
+        ('following_count', Follow.objects.filter(user_id__in=user_ids),
+         'user'),
+    )
+    for field, queryset, key in sources:
+        rows = queryset.order_by().values(key).annotate(
+            total=Count('pk')
+        ).values_list(key, 'total')
+        for user_id, total in rows:
+            counts[user_id][field] = total
+    return counts
+
+
+def get_stats(user):
+    """Счетчики пользователя; отсутствующая строка создается по факту"""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        reconcile_users([user.pk])
+        return UserStats.objects.get(user_id=user.pk)
+
+
+def reconcile_users(user_ids):
+    """Исправляет счетчики пачки пользователей.
+
+    Возвращает список созданных или исправленных строк.
+    """
+    counts = count_user_stats(user_ids)
+    existing = UserStats.objects.in_bulk(user_ids)
+    changed, created = [], []
+    for user_id, values in counts.items():
+        stats = existing.get(user_id)
+        if stats is None:
+            created.append(UserStats(user_id=user_id, **values))
+        elif any(getattr(stats, k) != v for k, v in values.items()):
+            for field, value in values.items():
+                setattr(stats, field, value)
+            changed.append(stats)
+    UserStats.objects.bulk_create(created, ignore_conflicts=True)
+    UserStats.objects.bulk_update(changed, USER_COUNTERS)
+    return created + changed
+
+
+def reconcile_posts(post_ids):
+    """Исправляет счетчики комментариев пачки постов"""
+    totals = dict(
+        Comment.objects.filter(post_id__in=post_ids).order_by().values(
+            'post'
+        ).annotate(total=Count('pk')).values_list('post', 'total')
+    )
+    changed = []
+    for post in Post.objects.filter(pk__in=post_ids).only('comments_count'):
+        total = totals.get(post.pk, 0)
+        if post.comments_count != total:
+            post.comments_count = total
+            changed.append(post)
+    Post.objects.bulk_update(changed, ['comments_count'])
+    return changed
+
+
+def user_ids_batches(batch_size):
+    """id пользователей пачками по возрастанию, без OFFSET"""
+    return _id_batches(User.objects.all(), batch_size)
+
+
+def post_ids_batches(batch_size):
+    """id постов пачками по возрастанию, без OFFSET"""
+    return _id_batches(Post.objects.all(), batch_size)
+
+
+def _id_batches(queryset, batch_size):
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
@@ -0,0 +1,84 @@
+import hashlib
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from sorl.thumbnail import delete
+
+from .models import Post, StoredImage
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(file_):
+    """SHA-256 содержимого файла, читается кусками"""
+    file_.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file_.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file_.seek(0)
+    return digest.hexdigest()
+
+
+def store(post):
+    """Сохраняет новую картинку поста, если такой еще нет.
+
+    Если файл с тем же содержимым уже лежит в хранилище, пост просто
+    ссылается на него, и новый файл и новые миниатюры не появляются.
+    Если такой же файл одновременно загрузил другой запрос, запись
+    StoredImage остается за ним, а своя копия удаляется.
+    """
+    image = post.image
+    if not image or image._committed:
+        return
+    digest = content_hash(image)
+    stored = StoredImage.objects.filter(sha256=digest).first()
+    if stored is not None and image.storage.exists(stored.name):
+        post.image = stored.name
+        return
+    image.save(image.name, image.file, save=False)
+    with transaction.atomic():
+        stored, created = StoredImage.objects.get_or_create(
+            sha256=digest, defaults={'name': image.name}
+        )
+        if created or stored.name == image.name:
+            return
+        if image.storage.exists(stored.name):
+            image.storage.delete(image.name)
+            post.image = stored.name
+        else:
+            # Файл пропал из хранилища: запись указывает на новую копию
+            stored.name = image.name
+            stored.save(update_fields=['name'])
+
+
+def retain(name):
+    """Еще один пост ссылается на файл name"""
+    StoredImage.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def delete_file(name):
+    """Удаляет файл и его миниатюры после коммита транзакции"""
+    transaction.on_commit(lambda: delete(name))
+
+
+def release(name):
+    """Пост больше не ссылается на name; последний удаляет файл.
+
+    Файлы, которых нет в StoredImage, не трогаются: их соберет
+    команда dedup_images.
+    """
+    StoredImage.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1
+    )
+    deleted, _ = StoredImage.objects.filter(name=name, refcount=0).delete()
+    if deleted:
+        delete_file(name)
+
+
+def recount():
+    """Пересчитывает refcount всех файлов по постам"""
+    refs = Post.objects.filter(image=OuterRef('name')).order_by().values(
+        'image'
+    ).annotate(refs=Count('pk')).values('refs')
+    StoredImage.objects.update(refcount=Coalesce(Subquery(refs), 0))
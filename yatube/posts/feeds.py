@@ -0,0 +1,314 @@
+import heapq
+import logging
+import time
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import FeedEntry, Follow, Post, UserStats
+
+BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def feed_limit():
+    """Сколько записей ленты хранится на одного пользователя"""
+    return settings.FEED_MAX_ENTRIES
+
+
+def pull_threshold():
+    """Число подписчиков, начиная с которого автор читается при показе"""
+    return settings.FEED_PULL_THRESHOLD
+
+
+def is_pull_author(author_id):
+    """Автору с большим числом подписчиков посты не разносятся"""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=pull_threshold()
+    ).exists()
+
+
+def pull_author_ids(user):
+    """Авторы из подписок пользователя, которых лента читает сама.
+
+    Число подписчиков берется из счетчика UserStats, поэтому запрос
+    читает только подписки пользователя, а не подписчиков авторов.
+    """
+    return list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=pull_threshold()
+    ).values_list('author', flat=True))
+
+
+def push_lookup(lookup):
+    """Поле поста в терминах записи ленты FeedEntry.
+
+    Дата берется из копии в записи, id поста - из post_id: так фильтр
+    и сортировка курсора идут по индексу ленты.
+    """
+    prefix = '-' if lookup.startswith('-') else ''
+    name = lookup.lstrip('-')
+    field, _, rest = name.partition('__')
+    if field == 'pub_date':
+        return lookup
+    if field == 'pk':
+        # post_id, а не post: сортировка по post шла бы по Meta.ordering
+        return prefix + 'post_id' + (f'__{rest}' if rest else '')
+    return f'{prefix}post__{name}'
+
+
+def push_q(condition):
+    """Копия Q с полями поста, переведенными через push_lookup"""
+    children = [
+        push_q(child) if isinstance(child, Q)
+        else (push_lookup(child[0]), child[1])
+        for child in condition.children
+    ]
+    return Q(
+        *children,
+        _connector=condition.connector,
+        _negated=condition.negated
+    )
+
+
+class MergedFeed:
+    """Ленивое k-путевое слияние отсортированных потоков постов.
+
+    Ведет себя как QuerySet ровно настолько, насколько это нужно
+    Paginator и CursorPaginator: filter(), order_by(), count() и срезы.
+    Для среза [a:b] из каждого потока читается не больше b записей,
+    поэтому стоимость страницы не зависит от числа постов авторов.
+    push - записи FeedEntry читателя: условия на поля поста в нем
+    переводятся на поля записи. pulls - словарь {id автора: его
+    посты}. Время чтения push- и pull-потоков копится в timings.
+    """
+    model = Post
+    ordered = True
+
+    def __init__(self, push, pulls, reverse=True):
+        self.push = push
+        self.pulls = pulls
+        self.reverse = reverse
+        self.timings = {'push': 0.0, 'pull': 0.0}
+
+    def filter(self, *args, **kwargs):
+        return MergedFeed(
+            self.push.filter(
+                *map(push_q, args),
+                **{push_lookup(name): value for name, value in kwargs.items()}
+            ),
+            {author_id: qs.filter(*args, **kwargs)
+             for author_id, qs in self.pulls.items()},
+            self.reverse
+        )
+
+    def order_by(self, *fields):
+        return MergedFeed(
+            self.push.order_by(*map(push_lookup, fields)),
+            {author_id: qs.order_by(*fields)
+             for author_id, qs in self.pulls.items()},
+            fields[0].startswith('-')
+        )
+
+    def count(self):
+        # Записи ленты авторов, которые читаются сами, уже есть в pull
+        push = self.push.exclude(post__author_id__in=list(self.pulls))
+        if not self.pulls:
+            return push.count()
+        # Все pull-потоки считаются одним запросом
+        return push.count() + reduce(or_, self.pulls.values()).count()
+
+    def _fetch(self, path, queryset, stop):
+        started = time.monotonic()
+        rows = list(queryset[:stop])
+        self.timings[path] += (time.monotonic() - started) * 1000
+        return rows
+
+    def _merge(self, stop):
+        pushed = [
+            entry.post for entry in self._fetch('push', self.push, stop)
+        ]
+        streams = [pushed] + [
+            self._fetch('pull', qs, stop) for qs in self.pulls.values()
+        ]
+        merged = heapq.merge(
+            *streams,
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=self.reverse
+        )
+        last_pk = None
+        for post in merged:
+            if post.pk != last_pk:
+                last_pk = post.pk
+                yield post
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        rows = list(islice(self._merge(stop), start, stop))
+        logger.debug(
+            'feed merge: push %.1f ms, pull %d authors %.1f ms',
+            self.timings['push'], len(self.pulls), self.timings['pull']
+        )
+        return rows
+
+
+def feed_entries(user):
+    """Записи ленты читателя с постами, авторами и группами.
+
+    Порядок (pub_date, post_id) совпадает с индексом
+    feed_user_pub_date_idx, поэтому страница и курсор читаются одним
+    проходом по индексу.
+    """
+    return FeedEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    ).defer('post__group__description').order_by('-pub_date', '-post_id')
+
+
+def get_feed(user):
+    """Лента подписок: разнесенные посты плюс посты популярных авторов"""
+    pulls = {
+        author_id: Post.objects.for_listing().filter(
+            author_id=author_id
+        ).order_by('-pub_date', '-pk')
+        for author_id in pull_author_ids(user)
+    }
+    return MergedFeed(feed_entries(user), pulls)
+
+
+def fan_out_post(post):
+    """Разносит новый пост по лентам всех подписчиков автора.
+
+    Каждая лента растет на одну запись, поэтому после разноски
+    переросшие feed_limit() ленты обрезаются.
+    """
+    if is_pull_author(post.author_id):
+        return
+    follower_ids = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in follower_ids),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim_feeds(follower_ids)
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки"""
+    if is_pull_author(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date').values_list('pk', 'pub_date')[:feed_limit()]
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim_feed(user_id)
+
+
+def push_author_backlog(author_id):
+    """Разносит последние посты автора по лентам всех его подписчиков.
+
+    Нужно, когда автор опускается ниже порога: его посты, написанные
+    в pull-режиме, ни в одну ленту не попали.
+    """
+    posts = list(Post.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date').values_list('pk', 'pub_date')[:feed_limit()])
+    follower_ids = list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True))
+    for start in range(0, len(follower_ids), BATCH_SIZE):
+        batch = follower_ids[start:start + BATCH_SIZE]
+        FeedEntry.objects.bulk_create(
+            (FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+             for user_id in batch for pk, pub_date in posts),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        trim_feeds(batch)
+
+
+def followers_changed(author_id, delta):
+    """Переключает автора между push и pull, если порог пересечен.
+
+    Вызывается после изменения счетчика подписчиков на delta. При
+    переходе в pull записи автора удаляются из лент, их заменяет
+    чтение при показе; при возврате в push посты разносятся заново.
+    """
+    followers = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    if followers is None:
+        return
+    was_pull = followers - delta > pull_threshold()
+    is_pull = followers > pull_threshold()
+    if is_pull and not was_pull:
+        FeedEntry.objects.filter(post__author_id=author_id).delete()
+    elif was_pull and not is_pull:
+        push_author_backlog(author_id)
+
+
+def remove_author_from_feed(user_id, author_id):
+    """Убирает из ленты посты автора после отписки"""
+    FeedEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+
+
+def trim_feed(user_id):
+    """Оставляет в ленте не больше feed_limit() свежих записей"""
+    entries = FeedEntry.objects.filter(user_id=user_id)
+    overflow = entries.order_by(
+        '-pub_date', '-post_id'
+    ).values_list('pub_date', 'post_id')[feed_limit():feed_limit() + 1]
+    for pub_date, post_id in overflow:
+        entries.filter(pub_date__lte=pub_date).exclude(
+            pub_date=pub_date, post_id__gt=post_id
+        ).delete()
+
+
+def trim_feeds(user_ids):
+    """Обрезает ленты пользователей user_ids, переросшие feed_limit().
+
+    Переросшие ленты ищутся одним запросом на пачку BATCH_SIZE
+    пользователей, обрезаются только они.
+    """
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        overflowing = FeedEntry.objects.filter(
+            user_id__in=user_ids[start:start + BATCH_SIZE]
+        ).order_by().values('user_id').annotate(
+            entries=Count('pk')
+        ).filter(
+            entries__gt=feed_limit()
+        ).values_list('user_id', flat=True)
+        for user_id in overflowing:
+            trim_feed(user_id)
+
+
+def rebuild_feed(user_id):
+    """Пересобирает ленту пользователя из подписок с нуля"""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(
+        author__following__user_id=user_id
+    ).exclude(
+        author_id__in=pull_author_ids(user_id)
+    ).order_by('-pub_date').values_list('pk', 'pub_date')[:feed_limit()]
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts),
+        batch_size=BATCH_SIZE
+    )
@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Comment, Post
+from .uploads import process_upload
 
 
 class PostForm(forms.ModelForm):
@@ -25,6 +27,13 @@ class PostForm(forms.ModelForm):
             )
         return data
 
+    def clean_image(self):
+        # Новая картинка пересжимается, уже сохраненная остается как есть
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return process_upload(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
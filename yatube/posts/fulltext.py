@@ -0,0 +1,121 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Post
+
+# Полнотекстовый индекс SQLite FTS5 над полем text. Таблица индекса
+# хранит только токены (content=), текст читается из самой таблицы,
+# а синхронность держат триггеры, поэтому индекс видит и update(),
+# и bulk_create(), и правки из админки.
+INDEXED_TABLES = (Post._meta.db_table, Comment._meta.db_table)
+
+CREATE_INDEX = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+    text, content='{table}', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+'''
+CREATE_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_insert
+    AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_delete
+    AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_update
+    AFTER UPDATE OF text ON {table} BEGIN
+        INSERT INTO {table}_fts({table}_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {table}_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+)
+REBUILD_INDEX = "INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"
+DROP_INDEX = (
+    'DROP TRIGGER IF EXISTS {table}_fts_insert',
+    'DROP TRIGGER IF EXISTS {table}_fts_delete',
+    'DROP TRIGGER IF EXISTS {table}_fts_update',
+    'DROP TABLE IF EXISTS {table}_fts',
+)
+
+TOKEN = re.compile(r'\w+')
+
+
+def is_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection, tables=INDEXED_TABLES):
+    """Создает индексы и триггеры, если их нет, и перестраивает индексы.
+
+    Пересоздание таблицы при миграции SQLite удаляет ее триггеры,
+    поэтому миграции, меняющие Post или Comment, вызывают install снова.
+    """
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        for table in tables:
+            cursor.execute(CREATE_INDEX.format(table=table))
+            for sql in CREATE_TRIGGERS:
+                cursor.execute(sql.format(table=table))
+            cursor.execute(REBUILD_INDEX.format(table=table))
+
+
+def uninstall(using=connection, tables=INDEXED_TABLES):
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        for table in tables:
+            for sql in DROP_INDEX:
+                cursor.execute(sql.format(table=table))
+
+
+def match_expression(term):
+    """Запрос FTS5 из пользовательского ввода.
+
+    Каждое слово ищется по префиксу, слова объединяются через AND.
+    Синтаксис FTS5 из ввода не пропускается: слова берутся в кавычки.
+    """
+    return ' '.join(f'"{token}"*' for token in TOKEN.findall(term))
+
+
+def matching(queryset, term):
+    """Записи queryset, текст которых подходит под term"""
+    expression = match_expression(term)
+    if not expression:
+        return queryset.none()
+    if not is_available():
+        return queryset.filter(text__icontains=term)
+    table = queryset.model._meta.db_table
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH %s',
+        (expression,)
+    ))
+
+
+def search_posts(term):
+    """Посты по запросу term, самые подходящие первыми (bm25)"""
+    posts = Post.objects.for_listing()
+    expression = match_expression(term)
+    if not expression:
+        return posts.none()
+    if not is_available():
+        return posts.filter(text__icontains=term)
+    table = Post._meta.db_table
+    return posts.extra(
+        tables=[f'{table}_fts'],
+        where=[f'{table}_fts.rowid = {table}.id', f'{table}_fts MATCH %s'],
+        params=[expression],
+        select={'rank': f'bm25({table}_fts)'},
+        order_by=['rank', '-pub_date']
+    )
@@ -0,0 +1,29 @@
+from django.template.loader import render_to_string
+
+from core import holes
+
+from .models import Follow
+
+
+@holes.register('switcher')
+def switcher(request, tab, context):
+    '''Вкладки "Все авторы" и "Избранные авторы"'''
+    return render_to_string(
+        'posts/includes/switcher.html', {tab: True}, request
+    )
+
+
+@holes.register('follow_button')
+def follow_button(request, username, context):
+    '''Кнопка подписки на автора в его профиле'''
+    if context is not None and 'following' in context:
+        following = context['following']
+    else:
+        following = (request.user.is_authenticated
+                     and Follow.objects.filter(
+                         user=request.user,
+                         author__username=username).exists())
+    return render_to_string('posts/includes/follow_button.html', {
+        'author_username': username,
+        'following': following
+    }, request)
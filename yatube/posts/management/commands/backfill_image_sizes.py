@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts import caching, uploads
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Записывает размеры и формат картинок в уже существующие посты'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько файлов обрабатывать в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        names = Post.objects.exclude(image='').filter(
+            image_width__isnull=True
+        ).order_by('image').values_list('image', flat=True).distinct()
+        filled = missing = 0
+        last = ''
+        while True:
+            batch = list(names.filter(image__gt=last)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                for name in batch:
+                    width, height, format_ = uploads.image_info(storage, name)
+                    if width is None:
+                        missing += 1
+                        continue
+                    filled += Post.objects.filter(image=name).update(
+                        image_width=width,
+                        image_height=height,
+                        image_format=format_,
+                        updated=timezone.now()
+                    )
+            last = batch[-1]
+        if filled:
+            caching.bump(caching.GLOBAL_SCOPE)
+        self.stdout.write(
+            f'Заполнено постов: {filled}, файлов не прочитано: {missing}'
+        )
@@ -0,0 +1,77 @@
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from posts.management.commands.benchmark_uploads import sample_image
+from posts.thumbnails import SRCSET_BASE, thumbnail_specs
+
+# Ширина экрана в CSS-пикселях и плотность пикселей типичных клиентов
+VIEWPORTS = (
+    ('телефон 360px, 2x', 360, 2),
+    ('телефон 412px, 1x', 412, 1),
+    ('планшет 768px, 2x', 768, 2),
+    ('ноутбук 1366px, 1x', 1366, 1),
+)
+# Ширина, которую карточка занимает на широком экране (sizes в шаблоне)
+CARD_WIDTH = 960
+
+
+def rendition_sizes(content):
+    """Размер в байтах каждого варианта card: ширина -> байты"""
+    source = Image.open(BytesIO(content)).convert('RGB')
+    sizes = {}
+    for name, (geometry, _) in thumbnail_specs().items():
+        if not name.startswith(SRCSET_BASE):
+            continue
+        width, height = map(int, geometry.split('x'))
+        buffer = BytesIO()
+        ImageOps.fit(source, (width, height)).save(
+            buffer, 'JPEG', quality=sorl_settings.THUMBNAIL_QUALITY
+        )
+        sizes[width] = len(buffer.getvalue())
+    return sizes
+
+
+def chosen_width(widths, viewport, density):
+    """Вариант, который браузер возьмет из srcset: самый узкий из тех,
+    что не уже нужного числа пикселей, иначе самый широкий"""
+    needed = min(viewport, CARD_WIDTH) * density
+    wide_enough = [width for width in widths if width >= needed]
+    return min(wide_enough) if wide_enough else max(widths)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает трафик картинок до и после srcset на наборе '
+        'сгенерированных картинок для типичных экранов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--images', type=int, default=10,
+            help='Сколько картинок сгенерировать'
+        )
+
+    def handle(self, *args, **options):
+        renditions = [
+            rendition_sizes(sample_image(1600, 1200).getvalue())
+            for _ in range(options['images'])
+        ]
+        total_before = total_after = 0
+        for label, viewport, density in VIEWPORTS:
+            before = after = 0
+            for sizes in renditions:
+                before += sizes[max(sizes)]
+                after += sizes[chosen_width(sizes, viewport, density)]
+            total_before += before
+            total_after += after
+            self.stdout.write(
+                f'{label}: {before // 1024} -> {after // 1024} КБ '
+                f'({100 - 100 * after // before}% экономии)'
+            )
+        self.stdout.write(
+            f'Итого: {total_before // 1024} -> {total_after // 1024} КБ '
+            f'({100 - 100 * total_after // total_before}% экономии)'
+        )
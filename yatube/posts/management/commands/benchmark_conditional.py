@@ -0,0 +1,71 @@
+import statistics
+from http import HTTPStatus
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from posts.management.commands.benchmark_uploads import timed
+from posts.models import Post
+
+
+def request_page(path, headers=None):
+    """Ответ view на GET path без middleware, как для анонима"""
+    request = RequestFactory().get(path, **(headers or {}))
+    request.user = AnonymousUser()
+    request.resolver_match = resolve(path)
+    match = request.resolver_match
+    return match.func(request, *match.args, **match.kwargs)
+
+
+def measure(path, repeat, headers=None):
+    """(статус, байты тела, медиана времени ответа в мс)"""
+    times = []
+    for _ in range(repeat):
+        response, elapsed = timed(request_page, path, headers)
+        times.append(elapsed)
+    return response.status_code, len(response.content), statistics.median(
+        times
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает повторный просмотр страниц поста, профиля и группы '
+        'без валидаторов и с If-None-Match: байты и время ответа'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз запрашивать каждую страницу'
+        )
+
+    def pages(self):
+        post = Post.objects.select_related('author', 'group').filter(
+            group__isnull=False
+        ).first()
+        if post is None:
+            raise CommandError('Нужен хотя бы один пост в группе')
+        return (
+            ('пост', reverse('posts:post_detail', args=[post.pk])),
+            ('профиль', reverse('posts:profile', args=[post.author.username])),
+            ('группа', reverse('posts:group_posts', args=[post.group.slug])),
+        )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        for label, path in self.pages():
+            first = request_page(path)
+            if first.status_code != HTTPStatus.OK:
+                raise CommandError(f'{path}: ответ {first.status_code}')
+            _, full_bytes, full_ms = measure(path, repeat)
+            status, bytes_, ms = measure(path, repeat, {
+                'HTTP_IF_NONE_MATCH': first['ETag']
+            })
+            self.stdout.write(
+                f'{label} {path}: повторный просмотр {full_bytes} байт '
+                f'за {full_ms:.2f} мс, с If-None-Match ответ {status} '
+                f'{bytes_} байт за {ms:.2f} мс'
+            )
@@ -0,0 +1,141 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import fulltext
+from posts.management.commands.benchmark_uploads import timed
+
+TABLE = 'bench_post'
+SYLLABLES = (
+    'ка', 'ло', 'ми', 'но', 'ра', 'ту', 'се', 'вы', 'же', 'по',
+    'ст', 'ор', 'ен', 'ла', 'ди', 'ко', 'ва', 'ни', 'те', 'бу',
+)
+
+
+def vocabulary(size, rng):
+    """Слова из слогов; частоты по закону Ципфа, как в живом тексте"""
+    words = sorted({
+        ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        for _ in range(size * 2)
+    })[:size]
+    rng.shuffle(words)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+
+def corpus(count, words, weights, rng, batch_size=10000):
+    """Пачки (id, текст) синтетических постов длиной 10-60 слов"""
+    for start in range(0, count, batch_size):
+        yield [
+            (pk, ' '.join(rng.choices(
+                words, weights, k=rng.randint(10, 60)
+            )))
+            for pk in range(start + 1, min(start + batch_size, count) + 1)
+        ]
+
+
+def create_schema(db):
+    db.execute(f'CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, text TEXT)')
+    db.execute(fulltext.CREATE_INDEX.format(table=TABLE))
+    for sql in fulltext.CREATE_TRIGGERS:
+        db.execute(sql.format(table=TABLE))
+
+
+def latency(db, sql, params, repeat):
+    """Медиана и худшее время запроса в миллисекундах"""
+    times = [
+        timed(lambda: db.execute(sql, params).fetchall())[1]
+        for _ in range(repeat)
+    ]
+    return statistics.median(times), max(times)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет скорость индексации и время поиска FTS5 против '
+        'LIKE на синтетическом корпусе во временной базе SQLite'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=1_000_000,
+            help='Размер корпуса'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз повторять каждый запрос'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора, чтобы корпус повторялся'
+        )
+
+    def queries(self, words):
+        """Частое слово, редкое слово, два слова и префикс"""
+        return (
+            ('частое слово', words[0]),
+            ('редкое слово', words[-1]),
+            ('два слова', f'{words[1]} {words[20]}'),
+            ('префикс', words[5][:3]),
+        )
+
+    def handle(self, *args, **options):
+        if not fulltext.is_available():
+            raise CommandError('Полнотекстовый поиск работает только с SQLite')
+        rng = random.Random(options['seed'])
+        words, weights = vocabulary(5000, rng)
+        # Отдельная временная база: рабочую замер не трогает
+        with tempfile.TemporaryDirectory() as directory:
+            db = sqlite3.connect(os.path.join(directory, 'bench.sqlite3'))
+            create_schema(db)
+            insert = f'INSERT INTO {TABLE} (id, text) VALUES (?, ?)'
+            indexed = 0
+            elapsed = 0
+            for batch in corpus(options['posts'], words, weights, rng):
+                # Время генерации текста в замер не входит
+                _, batch_ms = timed(self.insert_batch, db, insert, batch)
+                elapsed += batch_ms / 1000
+                indexed += len(batch)
+            self.stdout.write(
+                f'Индексация: {indexed} постов за {elapsed:.1f} с '
+                f'({indexed / elapsed:.0f} постов/с)'
+            )
+            _, rebuild_ms = timed(
+                db.execute, fulltext.REBUILD_INDEX.format(table=TABLE)
+            )
+            self.stdout.write(f'Перестройка индекса: {rebuild_ms:.0f} мс')
+            self.report_latency(db, words, options['repeat'])
+            db.close()
+
+    def insert_batch(self, db, insert, batch):
+        with db:
+            db.executemany(insert, batch)
+
+    def report_latency(self, db, words, repeat):
+        ranked = (
+            f'SELECT rowid FROM {TABLE}_fts WHERE {TABLE}_fts MATCH ? '
+            f'ORDER BY bm25({TABLE}_fts) LIMIT 10'
+        )
+        # Подсчет всех совпадений: LIKE не может остановиться раньше,
+        # если результаты нужно упорядочить или разбить на страницы
+        fts_count = (
+            f'SELECT count(*) FROM {TABLE}_fts WHERE {TABLE}_fts MATCH ?'
+        )
+        like_count = f'SELECT count(*) FROM {TABLE} WHERE text LIKE ?'
+        for label, term in self.queries(words):
+            expression = (fulltext.match_expression(term),)
+            ranked_ms, _ = latency(db, ranked, expression, repeat)
+            fts_ms, _ = latency(db, fts_count, expression, repeat)
+            # LIKE ищет одну подстроку, для сравнения берется первое слово
+            like_ms, _ = latency(
+                db, like_count, (f'%{term.split()[0]}%',), repeat
+            )
+            self.stdout.write(
+                f'{label} «{term}»: FTS5 первые 10 по bm25 '
+                f'{ranked_ms:.1f} мс, все совпадения {fts_ms:.1f} мс, '
+                f'LIKE {like_ms:.1f} мс (медианы)'
+            )
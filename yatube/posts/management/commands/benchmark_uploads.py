@@ -0,0 +1,88 @@
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+
+from posts import uploads
+from posts.thumbnails import POST_THUMBNAILS
+
+
+def sample_image(width, height):
+    """Фотография-заглушка: градиенты с шумом, JPEG с высоким качеством"""
+    size = (width, height)
+    image = Image.merge('RGB', [
+        Image.linear_gradient('L').resize(size),
+        Image.effect_noise(size, 40),
+        Image.radial_gradient('L').resize(size),
+    ])
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=95)
+    buffer.name = f'sample_{width}x{height}.jpg'
+    return buffer
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def make_thumbnail(content):
+    """То, что делает sorl для миниатюры card: декодирование и обрезка"""
+    width, height = map(int, POST_THUMBNAILS['card'][0].split('x'))
+    image = Image.open(BytesIO(content))
+    return ImageOps.fit(image.convert('RGB'), (width, height))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер и время создания миниатюр для исходных '
+        'картинок и картинок после обработки при загрузке'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*',
+            help='Картинки для замера; без них создаются заглушки'
+        )
+        parser.add_argument(
+            '--format', default='JPEG', choices=uploads.UPLOAD_FORMATS,
+            help='Формат, в который пересжимаются картинки'
+        )
+
+    def samples(self, files):
+        if not files:
+            return [sample_image(4000, 3000), sample_image(6000, 4000)]
+        samples = []
+        for path in files:
+            with open(path, 'rb') as file_:
+                buffer = BytesIO(file_.read())
+            buffer.name = path
+            samples.append(buffer)
+        return samples
+
+    def handle(self, *args, **options):
+        totals = {'source': 0, 'stored': 0, 'source_ms': 0, 'stored_ms': 0}
+        for sample in self.samples(options['files']):
+            source = sample.getvalue()
+            (stored, width, height), process_ms = timed(
+                uploads.process_image, sample, format_=options['format']
+            )
+            _, source_ms = timed(make_thumbnail, source)
+            _, stored_ms = timed(make_thumbnail, stored)
+            totals['source'] += len(source)
+            totals['stored'] += len(stored)
+            totals['source_ms'] += source_ms
+            totals['stored_ms'] += stored_ms
+            self.stdout.write(
+                f'{sample.name}: {len(source) // 1024} КБ -> '
+                f'{len(stored) // 1024} КБ ({width}x{height}), '
+                f'обработка {process_ms:.0f} мс, миниатюра '
+                f'{source_ms:.0f} -> {stored_ms:.0f} мс'
+            )
+        self.stdout.write(
+            f'Итого: диск {totals["source"] // 1024} -> '
+            f'{totals["stored"] // 1024} КБ, миниатюры '
+            f'{totals["source_ms"]:.0f} -> {totals["stored_ms"]:.0f} мс'
+        )
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+
+from posts import thumbnail_gc
+
+# Курсор хранится рядом с данными sorl: кэш процесса между запусками
+# команды не сохраняется
+CURSOR_KEY = 'cursor'
+CURSOR_IDENTITY = 'gc'
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет миниатюры удаленных и замененных картинок и файлы '
+        'media/cache, о которых не знает sorl. Продолжает с места, '
+        'где остановился прошлый запуск'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, что будет удалено'
+        )
+        parser.add_argument(
+            '--time-budget', type=float,
+            help='Сколько секунд может работать один запуск'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько записей или файлов проверять за раз'
+        )
+        parser.add_argument(
+            '--grace', type=int, default=60,
+            help='Файлы моложе стольких минут не удаляются'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать проход сначала, а не с сохраненного места'
+        )
+
+    def save_cursor(self, cursor):
+        if cursor is None:
+            default.kvstore._delete(CURSOR_KEY, identity=CURSOR_IDENTITY)
+        else:
+            default.kvstore._set(CURSOR_KEY, cursor, identity=CURSOR_IDENTITY)
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        cursor = None if options['restart'] else default.kvstore._get(
+            CURSOR_KEY, identity=CURSOR_IDENTITY
+        )
+        cursor = cursor or {'phase': thumbnail_gc.SOURCES, 'after': ''}
+        cursor, stats = thumbnail_gc.collect(
+            cursor,
+            thumbnail_gc.Deadline(options['time_budget']),
+            batch_size=options['batch_size'],
+            dry_run=dry_run,
+            grace=timedelta(minutes=options['grace'])
+        )
+        # Пробный запуск не двигает курсор настоящей сборки
+        if not dry_run:
+            self.save_cursor(cursor)
+        verb = 'Будет удалено' if dry_run else 'Удалено'
+        self.stdout.write(
+            f'{verb}: миниатюр {stats["thumbnails"]} '
+            f'(проверено картинок {stats["sources"]}), '
+            f'файлов {stats["files"]} (проверено {stats["scanned"]})'
+        )
+        self.stdout.write(
+            'Проход завершен' if cursor is None
+            else f'Остановлено на {cursor["phase"]}: {cursor["after"]}'
+        )
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts import caching, dedup
+from posts.models import Post, StoredImage
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит одинаковые картинки постов, оставляет по одному файлу '
+        'и пересчитывает ссылки на файлы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет объединено'
+        )
+
+    def merge(self, name, keep):
+        """Переводит посты с name на keep и удаляет файл name"""
+        with transaction.atomic():
+            Post.objects.filter(image=name).update(
+                image=keep, updated=timezone.now()
+            )
+            StoredImage.objects.filter(name=name).delete()
+            dedup.delete_file(name)
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = Post._meta.get_field('image').storage
+        known = {
+            digest: name for digest, name in StoredImage.objects.values_list(
+                'sha256', 'name'
+            ) if storage.exists(name)
+        }
+        names = Post.objects.exclude(image='').order_by('image').values_list(
+            'image', flat=True
+        ).distinct()
+        merged = missing = 0
+        for name in names.iterator():
+            if not storage.exists(name):
+                missing += 1
+                continue
+            with storage.open(name) as file_:
+                digest = dedup.content_hash(file_)
+            keep = known.setdefault(digest, name)
+            if keep == name:
+                if not dry_run:
+                    StoredImage.objects.update_or_create(
+                        sha256=digest, defaults={'name': name}
+                    )
+                continue
+            merged += 1
+            self.stdout.write(f'{name} -> {keep}')
+            if not dry_run:
+                self.merge(name, keep)
+        if not dry_run:
+            dedup.recount()
+            caching.bump(caching.GLOBAL_SCOPE)
+        self.stdout.write(
+            f'Объединено файлов: {merged}, файлов не найдено: {missing}'
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры для картинок уже существующих постов'
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct()
+        futures = [thumbnails.submit(name) for name in names.iterator()]
+        for future in futures:
+            if future is not None:
+                future.result()
+        self.stdout.write(f'Обработано картинок: {len(futures)}')
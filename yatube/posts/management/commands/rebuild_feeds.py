@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feeds
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько пользователей обрабатывать в одной транзакции'
+        )
+        parser.add_argument(
+            '--user', dest='user_ids', type=int, action='append',
+            help='id пользователя, ленту которого нужно пересобрать'
+        )
+        parser.add_argument(
+            '--trim-only', action='store_true',
+            help='Только обрезать ленты до FEED_MAX_ENTRIES записей'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids'] or list(
+            Follow.objects.order_by('user_id').values_list(
+                'user_id', flat=True
+            ).distinct()
+        )
+        action = feeds.trim_feed if options['trim_only'] else (
+            feeds.rebuild_feed
+        )
+        batch_size = options['batch_size']
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            with transaction.atomic():
+                for user_id in batch:
+                    action(user_id)
+            self.stdout.write(
+                f'Обработано лент: {start + len(batch)} из {len(user_ids)}'
+            )
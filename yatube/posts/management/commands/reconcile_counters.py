@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счетчики с данными и чинит расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько строк проверять в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fixed_users = fixed_posts = 0
+        for user_ids in counters.user_ids_batches(batch_size):
+            with transaction.atomic():
+                fixed_users += len(counters.reconcile_users(user_ids))
+        for post_ids in counters.post_ids_batches(batch_size):
+            with transaction.atomic():
+                fixed_posts += len(counters.reconcile_posts(post_ids))
+        self.stdout.write(
+            f'Исправлено счетчиков: пользователей {fixed_users}, '
+            f'постов {fixed_posts}'
+        )
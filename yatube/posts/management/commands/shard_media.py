@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts import caching, dedup, thumbnails
+from posts.models import Post, StoredImage
+from posts.storage import SHARDED_NAME, shard_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов из плоского каталога в подкаталоги '
+        'по хешу. Команду можно прервать и запустить заново'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько файлов переносить в одной транзакции'
+        )
+
+    def move(self, storage, name):
+        """Копирует файл на новое место и переводит на него посты.
+
+        Старый файл удаляется только после коммита: пока транзакция
+        не завершена, страницы продолжают показывать его.
+        """
+        new_name = shard_name(name)
+        if storage.exists(new_name) and (
+            storage.size(new_name) != storage.size(name)
+        ):
+            # Копия, недописанная прошлым запуском
+            storage.delete(new_name)
+        if not storage.exists(new_name):
+            with storage.open(name) as file_:
+                new_name = storage.save(new_name, file_)
+        Post.objects.filter(image=name).update(
+            image=new_name, updated=timezone.now()
+        )
+        StoredImage.objects.filter(name=name).update(name=new_name)
+        dedup.delete_file(name)
+        thumbnails.enqueue(new_name)
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        names = Post.objects.exclude(image='').exclude(
+            image__regex=SHARDED_NAME
+        ).order_by('image').values_list('image', flat=True).distinct()
+        moved = missing = 0
+        last = ''
+        while True:
+            batch = list(names.filter(image__gt=last)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                for name in batch:
+                    if storage.exists(name):
+                        self.move(storage, name)
+                        moved += 1
+                    else:
+                        missing += 1
+            caching.bump(caching.GLOBAL_SCOPE)
+            last = batch[-1]
+            self.stdout.write(f'Перенесено файлов: {moved}')
+        self.stdout.write(
+            f'Готово: перенесено {moved}, файлов не найдено {missing}'
+        )
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+def dedup_follows(apps, schema_editor):
+    """Удаляет повторные подписки, оставляя самую раннюю"""
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    duplicates = Follow.objects.values('user', 'author').annotate(
+        first_id=models.Min('id'),
+        total=models.Count('id'),
+    ).filter(total__gt=1)
+    for row in duplicates:
+        Follow.objects.filter(
+            user_id=row['user'],
+            author_id=row['author']
+        ).exclude(id=row['first_id']).delete()
+        # Лишние подписки были учтены в счетчиках
+        extra = row['total'] - 1
+        UserStats.objects.filter(user_id=row['author']).update(
+            followers_count=models.F('followers_count') - extra
+        )
+        UserStats.objects.filter(user_id=row['user']).update(
+            following_count=models.F('following_count') - extra
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedup_follows, migrations.RunPython.noop),
+    ]
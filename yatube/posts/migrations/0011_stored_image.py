@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256 содержимого')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Путь в хранилище')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+            ],
+            options={
+                'verbose_name': 'Сохраненная картинка',
+                'verbose_name_plural': 'Сохраненные картинки',
+            },
+        ),
+    ]
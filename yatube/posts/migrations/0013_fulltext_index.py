@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from posts import fulltext
+
+
+def install_index(apps, schema_editor):
+    fulltext.install(schema_editor.connection)
+
+
+def uninstall_index(apps, schema_editor):
+    fulltext.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_image_size'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_index, uninstall_index),
+    ]
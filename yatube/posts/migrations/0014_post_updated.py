@@ -0,0 +1,27 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+from posts import fulltext
+
+
+def reinstall_index(apps, schema_editor):
+    # SQLite пересоздает таблицу при добавлении поля, триггеры
+    # полнотекстового индекса пропадают вместе со старой таблицей
+    fulltext.install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(reinstall_index, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,8 @@ from django.db import models
 User = get_user_model()
 
 SYMBOLS_AMOUNT = 15
+# Поля-счетчики меняются только через F(), save() их не перезаписывает
+POST_COUNTER_FIELDS = ('comments_count',)
 
 
 class Group(models.Model):
@@ -15,6 +17,21 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Посты для лент: автор и группа одним запросом, без описания
+        группы, которое в лентах не выводится"""
+        return self.select_related('author', 'group').defer(
+            'group__description'
+        )
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Комментарии вместе с авторами"""
+        return self.select_related('author')
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -44,16 +61,75 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Размеры и формат картинки заполняются при сохранении, чтобы
+    # шаблоны не открывали файл ради них
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_format = models.CharField(
+        'Формат картинки',
+        max_length=10,
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+    # Входит в ключ закэшированной карточки поста: после правки
+    # карточка рендерится заново
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-pk']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Индексы под ленты: общая, автора и группы, новые записи первыми
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         # Выводим текст поста
         return self.text[:SYMBOLS_AMOUNT]
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in POST_COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -77,10 +153,18 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-created']
+        ordering = ['-created', '-pk']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -96,3 +180,88 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост'
+    )
+    # Копия Post.pub_date, чтобы лента читалась по одному индексу
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx'
+            )
+        ]
+
+
+class UserStats(models.Model):
+    """Счетчики пользователя, которые поддерживаются при записи"""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+
+class StoredImage(models.Model):
+    """Файл картинки, общий для всех постов с тем же содержимым"""
+    sha256 = models.CharField(
+        'SHA-256 содержимого',
+        max_length=64,
+        unique=True
+    )
+    name = models.CharField('Путь в хранилище', max_length=100, unique=True)
+    refcount = models.PositiveIntegerField('Количество постов', default=0)
+
+    class Meta:
+        verbose_name = 'Сохраненная картинка'
+        verbose_name_plural = 'Сохраненные картинки'
+
+    def __str__(self) -> str:
+        return self.name
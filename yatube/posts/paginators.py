@@ -0,0 +1,202 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+CURSOR_SEPARATOR = '|'
+# До стольких записей COUNT(*) дешев и считается точно
+EXACT_COUNT_LIMIT = 10000
+
+
+class CursorPage(Page):
+    """Страница keyset-паджинатора: знает соседей, но не общее число"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self.object_list:
+            return ''
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.object_list:
+            return ''
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class CursorPaginator(Paginator):
+    """Keyset-паджинатор по паре (key, pk) в порядке убывания.
+
+    Вместо COUNT(*) и OFFSET использует условие по ключу последней
+    показанной записи, поэтому любая страница стоит столько же,
+    сколько первая. Курсоры передаются в ?after= и ?before=.
+    """
+
+    def __init__(self, object_list, per_page, key='pub_date'):
+        super().__init__(object_list, per_page)
+        self.key = key
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.key).isoformat()
+        raw = f'{value}{CURSOR_SEPARATOR}{obj.pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает (key, pk) или None для испорченного курсора"""
+        try:
+            raw = base64.urlsafe_b64decode(
+                cursor + '=' * (-len(cursor) % 4)
+            ).decode()
+            value, pk = raw.rsplit(CURSOR_SEPARATOR, 1)
+            field = self.object_list.model._meta.get_field(self.key)
+            return field.to_python(value), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError,
+                TypeError, ValidationError):
+            return None
+
+    def _after(self, position):
+        value, pk = position
+        return self.object_list.filter(
+            Q(**{f'{self.key}__lt': value})
+            | Q(**{self.key: value, 'pk__lt': pk})
+        ).order_by(f'-{self.key}', '-pk')
+
+    def _before(self, position):
+        value, pk = position
+        return self.object_list.filter(
+            Q(**{f'{self.key}__gt': value})
+            | Q(**{self.key: value, 'pk__gt': pk})
+        ).order_by(self.key, 'pk')
+
+    def get_page(self, after=None, before=None):
+        """Страница после курсора after или перед курсором before"""
+        after = after and self.decode_cursor(after)
+        before = before and self.decode_cursor(before)
+        if before:
+            rows = list(self._before(before)[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(rows, self, True, has_previous)
+        if after:
+            queryset = self._after(after)
+        else:
+            queryset = self.object_list.order_by(f'-{self.key}', '-pk')
+        rows = list(queryset[:self.per_page + 1])
+        return CursorPage(
+            rows[:self.per_page], self,
+            len(rows) > self.per_page, bool(after)
+        )
+
+
+class CountedPaginator(Paginator):
+    """Paginator, которому число записей сообщают снаружи.
+
+    count - число или функция без аргументов, например значение
+    счетчика или закэшированный COUNT(*); без него COUNT(*) считается
+    как обычно. Для очень длинных списков approximate_pages дает
+    округленное число страниц: точное там не нужно и может устареть.
+    """
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+
+    @cached_property
+    def count(self):
+        if self.known_count is None:
+            return super().count
+        if callable(self.known_count):
+            return self.known_count()
+        return self.known_count
+
+    @property
+    def approximate_pages(self):
+        """Число страниц до двух значащих цифр или None для коротких"""
+        pages = self.num_pages
+        if pages < settings.PAGINATOR_APPROXIMATE_PAGES:
+            return None
+        step = 10 ** (len(str(pages)) - 2)
+        return round(pages / step) * step
+
+
+class EstimatedCountPaginator(Paginator):
+    """Паджинатор, который не считает строки всей таблицы.
+
+    Для queryset без фильтров количество оценивается по наибольшему
+    первичному ключу: это один шаг по индексу вместо полного обхода.
+    Оценка может быть больше настоящего числа из-за удаленных записей,
+    тогда последние страницы просто короче. Отфильтрованные и
+    небольшие выборки считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = queryset.aggregate(estimate=Max('pk'))['estimate']
+            if estimate is None:
+                return 0
+            if estimate > EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+def page_window(page, around=2, ends=1):
+    """Номера страниц для навигации: края и окно вокруг текущей.
+
+    Пропуски обозначаются None. Пропуск из одной страницы заменяется
+    самой страницей: многоточие было бы не короче ссылки.
+    """
+    number, last = page.number, page.paginator.num_pages
+    shown = (
+        set(range(1, min(ends, last) + 1))
+        | set(range(max(number - around, 1), min(number + around, last) + 1))
+        | set(range(max(last - ends + 1, 1), last + 1))
+    )
+    window = []
+    previous = 0
+    for current in sorted(shown):
+        if current - previous == 2:
+            window.append(current - 1)
+        elif current - previous > 2:
+            window.append(None)
+        window.append(current)
+        previous = current
+    return window
+
+
+def next_cursor(page):
+    """Курсор записи, следующей за последней записью страницы"""
+    if isinstance(page, CursorPage):
+        return page.next_cursor
+    if not len(page):
+        return ''
+    return CursorPaginator(page.paginator.object_list, 1).encode_cursor(
+        page[len(page) - 1]
+    )
+
+
+def previous_cursor(page):
+    """Курсор первой записи страницы для перехода назад"""
+    if isinstance(page, CursorPage):
+        return page.previous_cursor
+    if not len(page):
+        return ''
+    return CursorPaginator(page.paginator.object_list, 1).encode_cursor(
+        page[0]
+    )
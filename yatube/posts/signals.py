@@ -0,0 +1,193 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, counters, dedup, feeds, thumbnails, uploads
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Поля пользователя, которые выводятся в карточках постов
+AUTHOR_NAME_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_feeds(sender, instance, created, **kwargs):
+    '''Новый пост попадает в ленты подписчиков автора'''
+    if created:
+        feeds.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed_on_follow(sender, instance, created, **kwargs):
+    '''После подписки в ленту добавляются посты автора'''
+    if created:
+        feeds.backfill_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_feed_on_unfollow(sender, instance, **kwargs):
+    '''После отписки посты автора пропадают из ленты'''
+    feeds.remove_author_from_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_listings(sender, instance, **kwargs):
+    '''Новый, измененный или удаленный пост сбрасывает его страницы'''
+    scopes = caching.post_scopes(instance)
+    # При редактировании пост мог уйти из прежней группы
+    previous = getattr(instance, '_previous_group_slug', None)
+    if previous:
+        scopes.append(caching.group_scope(previous))
+    caching.bump(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_listings(sender, instance, **kwargs):
+    '''Комментарий сбрасывает страницы с комментируемым постом'''
+    caching.bump(*caching.post_scopes(instance.post))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_listings(sender, instance, **kwargs):
+    '''Ссылки на группы есть на всех страницах со списками постов'''
+    caching.bump(caching.GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_listings(sender, instance, created, update_fields=None,
+                               **kwargs):
+    '''Имя автора есть в карточках его постов на всех списках'''
+    if created or (update_fields is not None
+                   and not AUTHOR_NAME_FIELDS.intersection(update_fields)):
+        return
+    caching.bump(caching.GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_profile(sender, instance, **kwargs):
+    '''Обновляются кнопка подписки автора и число подписок читателя'''
+    caching.bump(
+        caching.author_scope(instance.author.username),
+        caching.author_scope(instance.user.username)
+    )
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    '''У каждого нового пользователя есть строка счетчиков'''
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def count_posts(sender, instance, created=False, **kwargs):
+    '''Счетчик постов автора'''
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+    elif kwargs['signal'] is post_delete:
+        counters.change_user_counter(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_listing_counts(sender, instance, created=False, **kwargs):
+    '''Закэшированное число постов главной и группы устаревает'''
+    if created or kwargs['signal'] is post_delete:
+        scopes = [caching.index_scope()]
+    else:
+        # При редактировании пост мог перейти из группы в группу
+        scopes = []
+        previous = getattr(instance, '_previous_group_slug', None)
+        if previous:
+            scopes.append(caching.group_scope(previous))
+    if instance.group_id:
+        scopes.append(caching.group_scope(instance.group.slug))
+    counters.forget_counts(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def count_comments(sender, instance, created=False, **kwargs):
+    '''Счетчик комментариев поста'''
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+    elif kwargs['signal'] is post_delete:
+        counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def count_follows(sender, instance, created=False, **kwargs):
+    '''Счетчики подписчиков автора и подписок читателя'''
+    if created:
+        delta = 1
+    elif kwargs['signal'] is post_delete:
+        delta = -1
+    else:
+        return
+    counters.change_user_counter(instance.author_id, 'followers_count', delta)
+    counters.change_user_counter(instance.user_id, 'following_count', delta)
+    feeds.followers_changed(instance.author_id, delta)
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, **kwargs):
+    '''Миниатюры новой картинки создаются в фоне, а не при показе'''
+    if instance.image:
+        thumbnails.enqueue(instance.image.name)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post(sender, instance, raw=False, **kwargs):
+    '''Картинка и группа поста до правки, одним запросом'''
+    instance._previous_image = ''
+    instance._previous_group_slug = None
+    if raw or instance._state.adding:
+        return
+    previous = Post.objects.filter(pk=instance.pk).values_list(
+        'image', 'group__slug'
+    ).first()
+    if previous is not None:
+        instance._previous_image = previous[0] or ''
+        instance._previous_group_slug = previous[1]
+
+
+@receiver(pre_save, sender=Post)
+def store_post_image(sender, instance, raw=False, **kwargs):
+    '''Одинаковые картинки хранятся одним файлом'''
+    if not raw:
+        dedup.store(instance)
+
+
+@receiver(pre_save, sender=Post)
+def measure_post_image(sender, instance, raw=False, **kwargs):
+    '''Размеры новой картинки записываются в пост'''
+    image = instance.image
+    if raw or image.name == getattr(instance, '_previous_image', None):
+        return
+    if not image:
+        instance.image_width = instance.image_height = None
+        instance.image_format = ''
+        return
+    (instance.image_width, instance.image_height,
+     instance.image_format) = uploads.image_info(image.storage, image.name)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def count_image_refs(sender, instance, **kwargs):
+    '''Счетчик ссылок на файл картинки; последняя ссылка удаляет файл'''
+    if kwargs['signal'] is post_delete:
+        previous, current = instance.image.name or '', ''
+    else:
+        previous = getattr(instance, '_previous_image', '')
+        current = instance.image.name or ''
+    if previous == current:
+        return
+    if current:
+        dedup.retain(current)
+    if previous:
+        dedup.release(previous)
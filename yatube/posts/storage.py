@@ -0,0 +1,40 @@
+import hashlib
+import posixpath
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+# posts/3f/a0/photo.jpg: два уровня каталогов из первых знаков хеша.
+# Строка, а не re.compile: выражение нужно и для фильтра image__regex
+SHARDED_NAME = r'/[0-9a-f]{2}/[0-9a-f]{2}/[^/]+$'
+
+
+def is_sharded(name):
+    return re.search(SHARDED_NAME, name) is not None
+
+
+def shard_name(name, key=None):
+    """Переносит файл в подкаталоги по хешу: posts/x.jpg -> posts/3f/a0/x.jpg
+
+    Без key хеш считается от самого имени, поэтому для уже
+    сохраненного файла новое имя всегда одно и то же.
+    """
+    dirname, basename = posixpath.split(name)
+    digest = hashlib.md5((key or name).encode()).hexdigest()
+    return posixpath.join(dirname, digest[:2], digest[2:4], basename)
+
+
+class ShardedStorage(FileSystemStorage):
+    """Файловое хранилище, раскладывающее загрузки по подкаталогам.
+
+    Каталог upload_to полей не меняется: подкаталоги добавляются
+    к нему в generate_filename, как это делает sorl для media/cache.
+    """
+
+    def generate_filename(self, filename):
+        filename = super().generate_filename(filename)
+        if is_sharded(filename):
+            return filename
+        # Случайный ключ: одинаковые имена файлов не копятся в одном каталоге
+        return shard_name(filename, key=uuid.uuid4().hex)
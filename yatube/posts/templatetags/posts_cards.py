@@ -0,0 +1,10 @@
+from django import template
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, variant='index'):
+    return cards.render_cards(posts, variant, context.get('request'))
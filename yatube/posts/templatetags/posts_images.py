@@ -0,0 +1,15 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, size='card'):
+    return thumbnails.post_thumbnail(post, size)
+
+
+@register.simple_tag
+def post_srcset(post):
+    return thumbnails.post_srcset(post)
@@ -0,0 +1,20 @@
+from django import template
+
+from posts import paginators
+
+register = template.Library()
+
+
+@register.filter
+def next_cursor(page):
+    return paginators.next_cursor(page)
+
+
+@register.filter
+def previous_cursor(page):
+    return paginators.previous_cursor(page)
+
+
+@register.simple_tag
+def page_window(page, around=2):
+    return paginators.page_window(page, around)
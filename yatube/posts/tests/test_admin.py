@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import paginators
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    '''Проверка списков админки на больших таблицах'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='Описание'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def create_rows(self, count):
+        start = User.objects.count()
+        names = [f'user_{number}' for number in range(start, start + count)]
+        User.objects.bulk_create(User(username=name) for name in names)
+        users = User.objects.filter(username__in=names)
+        Post.objects.bulk_create(
+            Post(author=user, group=self.group, text=f'Пост {user.username}')
+            for user in users
+        )
+        post = Post.objects.first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=user, text='Комментарий')
+            for user in users
+        )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_queries_do_not_grow_with_rows(self):
+        '''Число запросов списка не зависит от числа строк.'''
+        urls = (
+            reverse('admin:posts_post_changelist'),
+            reverse('admin:posts_comment_changelist'),
+        )
+        self.create_rows(2)
+        before = [self.count_queries(url) for url in urls]
+        self.create_rows(20)
+        after = [self.count_queries(url) for url in urls]
+        self.assertEqual(before, after)
+
+    def test_group_column_uses_autocomplete(self):
+        '''Колонка group выводит поле автодополнения, а не все группы.'''
+        self.create_rows(1)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, 'admin-autocomplete')
+
+    def test_count_is_estimated_for_large_tables(self):
+        '''Без фильтров число строк большой таблицы не считается.'''
+        self.create_rows(3)
+        queryset = Post.objects.all()
+        with mock.patch.object(paginators, 'EXACT_COUNT_LIMIT', 1):
+            with CaptureQueriesContext(connection) as context:
+                count = paginators.EstimatedCountPaginator(
+                    queryset, 10
+                ).count
+            self.assertEqual(count, Post.objects.latest('pk').pk)
+            self.assertNotIn('COUNT', context[0]['sql'])
+            filtered = paginators.EstimatedCountPaginator(
+                queryset.filter(pk=count), 10
+            )
+            self.assertEqual(filtered.count, 1)
+        self.assertEqual(
+            paginators.EstimatedCountPaginator(queryset, 10).count, 3
+        )
@@ -0,0 +1,118 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import cards
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    '''Проверка кэша карточек постов'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(3):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def count_renders(self, url):
+        with mock.patch(
+            'posts.cards.render_to_string', wraps=render_to_string
+        ) as render:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return render.call_count
+
+    def test_cards_are_reused(self):
+        '''Повторный показ ленты собирает карточки из кэша.'''
+        url = reverse('posts:follow_index')
+        self.assertEqual(self.count_renders(url), 3)
+
+    def test_page_with_pending_thumbnails_is_not_cached(self):
+        '''Страница с недоделанными миниатюрами не кэшируется целиком.'''
+        url = reverse('posts:homepage')
+        with mock.patch(
+            'posts.thumbnails.thumbnails_ready', return_value=False
+        ):
+            self.client.get(url)
+        self.assertEqual(self.count_renders(url), 3)
+        self.assertEqual(self.count_renders(url), 0)
+        self.assertEqual(self.count_renders(url), 0)
+
+    def test_variants_are_cached_separately(self):
+        '''В группе и в профиле у карточки своя разметка.'''
+        posts = list(Post.objects.for_listing())
+        index, group, profile = (
+            cards.render_cards(posts, variant)
+            for variant in ('index', 'group', 'profile')
+        )
+        self.assertIn('Все записи группы', index[0])
+        self.assertNotIn('Все записи группы', group[0])
+        self.assertNotIn('Автор:', profile[0])
+
+    def test_edit_renders_card_again(self):
+        '''После правки поста выводится новая карточка.'''
+        url = reverse('posts:follow_index')
+        self.client.get(url)
+        post = Post.objects.first()
+        author_client = Client()
+        author_client.force_login(self.author)
+        author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Исправленный пост', 'group': self.group.pk}
+        )
+        self.assertEqual(self.count_renders(url), 1)
+        self.assertContains(self.client.get(url), 'Исправленный пост')
+
+    def test_group_and_author_changes_render_cards_again(self):
+        '''Новый адрес группы и имя автора попадают в карточки.'''
+        url = reverse('posts:homepage')
+        self.client.get(url)
+        self.group.slug = 'new_slug'
+        self.group.save()
+        response = self.client.get(url)
+        self.assertContains(response, '/group/new_slug/')
+        self.assertNotContains(response, '/group/test_slug/')
+        self.author.first_name = 'Лев'
+        self.author.save()
+        self.assertContains(self.client.get(url), 'Лев')
+        self.client.force_login(self.author)
+        self.assertEqual(self.count_renders(url), 0)
+
+    def test_pending_thumbnails_are_not_cached(self):
+        '''Карточка с недоделанными миниатюрами не кэшируется.'''
+        url = reverse('posts:follow_index')
+        with mock.patch(
+            'posts.thumbnails.thumbnails_ready', return_value=False
+        ):
+            self.client.get(url)
+        self.assertEqual(self.count_renders(url), 3)
+
+    def test_page_with_pending_thumbnails_is_not_cached(self):
+        '''Страница с недоделанными миниатюрами не кэшируется целиком.'''
+        url = reverse('posts:homepage')
+        with mock.patch(
+            'posts.thumbnails.thumbnails_ready', return_value=False
+        ):
+            self.client.get(url)
+        self.assertEqual(self.count_renders(url), 3)
+        self.assertEqual(self.count_renders(url), 0)
@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, UserStats
+from ..paginators import CountedPaginator
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    '''Проверка денормализованных счетчиков'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Post.objects.create(author=cls.author, text='Второй пост')
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ок')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_counters_follow_writes(self):
+        '''Счетчики меняются при создании и удалении записей.'''
+        author_stats = UserStats.objects.get(user=self.author)
+        reader_stats = UserStats.objects.get(user=self.reader)
+        self.post.refresh_from_db()
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+        Follow.objects.filter(user=self.reader).delete()
+        Post.objects.filter(text='Второй пост').delete()
+        author_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 0)
+
+    def test_post_save_keeps_comment_counter(self):
+        '''Сохранение устаревшего объекта поста не сбивает счетчик.'''
+        stale_post = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.reader, text='2')
+        stale_post.text = 'Новый текст'
+        stale_post.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+
+    def test_pages_render_without_count_queries(self):
+        '''Профиль и страница поста не выполняют COUNT(*).'''
+        urls = (
+            reverse('posts:profile', kwargs={'username': 'test_author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                for query in context.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'])
+
+    def count_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return sum(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        )
+
+    def test_listing_count_is_cached(self):
+        '''Главная считает посты один раз до создания нового поста.'''
+        url = reverse('posts:homepage')
+        self.assertEqual(self.count_queries(url), 1)
+        self.assertEqual(self.count_queries(url, {'page': 2}), 0)
+        Post.objects.create(author=self.author, text='Третий пост')
+        self.assertEqual(self.count_queries(url, {'page': 3}), 1)
+        response = self.client.get(url, {'page': 4})
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+
+    def test_moved_post_updates_both_group_counts(self):
+        '''Перенос поста сбрасывает число постов старой и новой группы.'''
+        old, new = (
+            Group.objects.create(title=slug, slug=slug, description='')
+            for slug in ('old', 'new')
+        )
+        post = Post.objects.create(author=self.author, group=old, text='П')
+        urls = [
+            reverse('posts:group_posts', kwargs={'slug': group.slug})
+            for group in (old, new)
+        ]
+        for url in urls:
+            self.client.get(url)
+        post.group = new
+        post.save()
+        for url, count in zip(urls, (0, 1)):
+            response = self.client.get(url, {'page': 2})
+            self.assertEqual(response.context['page_obj'].paginator.count,
+                             count)
+
+    @override_settings(PAGINATOR_APPROXIMATE_PAGES=1000)
+    def test_approximate_pages(self):
+        '''Для длинных списков число страниц округляется.'''
+        paginator = CountedPaginator(Post.objects.all(), 10, count=52345)
+        self.assertEqual(paginator.num_pages, 5235)
+        self.assertEqual(paginator.approximate_pages, 5200)
+        paginator = CountedPaginator(Post.objects.all(), 10, count=9990)
+        self.assertIsNone(paginator.approximate_pages)
+
+    def test_reconcile_counters_command(self):
+        '''Команда reconcile_counters исправляет расхождения.'''
+        UserStats.objects.filter(user=self.author).update(posts_count=40)
+        UserStats.objects.filter(user=self.reader).delete()
+        Post.objects.filter(pk=self.post.pk).update(comments_count=7)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 2
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models.fields.files import ImageFieldFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import dedup
+from ..models import Post, StoredImage
+from .test_thumbnails import make_image
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def run_on_commit(func):
+    func()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.dedup.transaction', mock.Mock(
+    on_commit=run_on_commit, atomic=transaction.atomic
+))
+class ImageDedupTests(TestCase):
+    '''Проверка хранения одинаковых картинок одним файлом'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self, text):
+        self.client.post(reverse('posts:post_create'), {
+            'text': text, 'image': make_image()
+        })
+        return Post.objects.get(text=text)
+
+    def test_same_upload_shares_one_file(self):
+        '''Одинаковые загрузки ссылаются на один файл.'''
+        first = self.create_post('Первый')
+        second = self.create_post('Второй')
+        self.assertEqual(first.image.name, second.image.name)
+        stored = StoredImage.objects.get()
+        self.assertEqual(stored.name, first.image.name)
+        self.assertEqual(stored.refcount, 2)
+
+    def test_concurrent_upload_keeps_one_file(self):
+        '''Одновременная загрузка того же файла не создает копию.'''
+        real_save = ImageFieldFile.save
+        saved = []
+
+        def save_during_other_upload(image, name, content, save=True):
+            # Пока файл сохранялся, такой же загрузил другой запрос
+            real_save(image, name, content, save)
+            saved.append(image.name)
+            StoredImage.objects.create(
+                sha256=dedup.content_hash(image),
+                name=default_storage.save(
+                    'posts/other.jpg', ContentFile(image.read())
+                )
+            )
+
+        with mock.patch.object(
+            ImageFieldFile, 'save', autospec=True,
+            side_effect=save_during_other_upload
+        ):
+            post = self.create_post('Второй')
+        stored = StoredImage.objects.get()
+        self.assertEqual(post.image.name, stored.name)
+        self.assertEqual(stored.refcount, 1)
+        self.assertFalse(default_storage.exists(saved[0]))
+
+    def test_file_is_removed_with_last_reference(self):
+        '''Файл удаляется только вместе с последним постом.'''
+        first = self.create_post('Первый')
+        second = self.create_post('Второй')
+        name = first.image.name
+        first.delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(StoredImage.objects.get().refcount, 1)
+        second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredImage.objects.exists())
+
+    def test_dedup_images_command(self):
+        '''Команда dedup_images объединяет уже сохраненные копии.'''
+        content = make_image().read()
+        names = [
+            default_storage.save('posts/copy.jpg', ContentFile(content))
+            for _ in range(2)
+        ]
+        for name in names:
+            Post.objects.create(author=self.user, text=name, image=name)
+        call_command('dedup_images', stdout=StringIO())
+        self.assertEqual(
+            set(Post.objects.values_list('image', flat=True)), {names[0]}
+        )
+        self.assertFalse(default_storage.exists(names[1]))
+        self.assertEqual(StoredImage.objects.get().refcount, 2)
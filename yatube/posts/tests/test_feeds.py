@@ -0,0 +1,185 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feeds, paginators
+from ..models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class FeedEntryTests(TestCase):
+    '''Проверка материализованной ленты подписок'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.author = User.objects.create_user(username='test_author')
+        cls.stranger = User.objects.create_user(username='test_stranger')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_new_post_is_pushed_to_followers(self):
+        '''Новый пост автора попадает только в ленты подписчиков.'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост автора')
+        Post.objects.create(author=self.stranger, text='Чужой пост')
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'post')),
+            [(self.reader.pk, post.pk)]
+        )
+
+    def test_follow_backfills_and_unfollow_cleans_feed(self):
+        '''Подписка добавляет старые посты автора, отписка удаляет их.'''
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.reader_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(self.reader.feed_entries.count(), 1)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertFalse(self.reader.feed_entries.exists())
+
+    @override_settings(FEED_MAX_ENTRIES=3)
+    def test_backfill_keeps_only_newest_entries(self):
+        '''При подписке в ленте остаются FEED_MAX_ENTRIES свежих постов.'''
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            set(self.reader.feed_entries.values_list('post', flat=True)),
+            {post.pk for post in posts[-3:]}
+        )
+
+    @override_settings(FEED_MAX_ENTRIES=3)
+    def test_fan_out_keeps_only_newest_entries(self):
+        '''После разноски новых постов в ленте не больше FEED_MAX_ENTRIES.'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(6)
+        ]
+        for user in (self.reader, self.stranger):
+            self.assertEqual(
+                set(user.feed_entries.values_list('post', flat=True)),
+                {post.pk for post in posts[-3:]}
+            )
+
+    def test_follow_index_reads_feed_table(self):
+        '''Страница follow_index строится по записям ленты.'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост автора')
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        FeedEntry.objects.all().delete()
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_rebuild_feeds_command(self):
+        '''Команда rebuild_feeds восстанавливает потерянные записи.'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Пост автора')
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.reader.feed_entries.count(), 1)
+
+
+@override_settings(FEED_PULL_THRESHOLD=1)
+class HybridFeedTests(TestCase):
+    '''Проверка смешанной push/pull ленты'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.fan = User.objects.create_user(username='test_fan')
+        cls.author = User.objects.create_user(username='test_author')
+        cls.star = User.objects.create_user(username='test_star')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.fan, author=cls.star)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.star if i % 3 else cls.author,
+                text=f'Пост {i}'
+            )
+            for i in range(12)
+        ]
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_popular_author_is_not_pushed(self):
+        '''Посты автора выше порога не записываются в ленты.'''
+        self.assertFalse(
+            FeedEntry.objects.filter(post__author=self.star).exists()
+        )
+        self.assertEqual(
+            self.reader.feed_entries.count(),
+            Post.objects.filter(author=self.author).count()
+        )
+
+    def test_follow_index_merges_pulled_posts(self):
+        '''follow_index сливает push- и pull-потоки по дате.'''
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        newest = self.posts[::-1]
+        self.assertEqual(list(response.context['page_obj']), newest[:10])
+        response = self.reader_client.get(
+            reverse('posts:follow_index') + '?page=2'
+        )
+        self.assertEqual(list(response.context['page_obj']), newest[10:])
+
+    def test_merged_feed_supports_cursor(self):
+        '''Курсор по слитой ленте отдает оставшиеся посты.'''
+        first = self.reader_client.get(
+            reverse('posts:follow_index')
+        ).context['page_obj']
+        response = self.reader_client.get(
+            reverse('posts:follow_index'),
+            {'after': paginators.next_cursor(first)}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), self.posts[1::-1]
+        )
+
+    def test_pushed_and_pulled_duplicates_are_merged(self):
+        '''Пост, попавший в оба потока, показывается один раз.'''
+        FeedEntry.objects.create(
+            user=self.reader, post=self.posts[-1],
+            pub_date=self.posts[-1].pub_date
+        )
+        feed = feeds.get_feed(self.reader)
+        self.assertEqual(feed[0:3], self.posts[:-4:-1])
+        self.assertEqual(feed.count(), len(self.posts))
+        self.assertGreaterEqual(feed.timings['pull'], 0)
+
+    def test_author_below_threshold_is_pushed_again(self):
+        '''Посты автора, ушедшего из pull, разносятся подписчикам.'''
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        self.assertEqual(feeds.pull_author_ids(self.reader), [])
+        self.assertEqual(
+            set(self.reader.feed_entries.values_list('post', flat=True)),
+            {post.pk for post in self.posts}
+        )
+
+    def test_author_above_threshold_leaves_feeds(self):
+        '''Записи автора, перешедшего в pull, удаляются из лент.'''
+        Follow.objects.create(user=self.fan, author=self.author)
+        self.assertFalse(self.reader.feed_entries.exists())
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), self.posts[:-11:-1]
+        )
@@ -89,7 +89,8 @@ class PostCreateFormTests(TestCase):
         self.assertTrue(
             Post.objects.filter(
                 text='Тестовый пост',
-                image=f'posts/{test_image_name}'
+                image__startswith='posts/',
+                image__endswith=f'/{test_image_name}'
             ).exists()
         )
 
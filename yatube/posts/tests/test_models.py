@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from .. import feeds
+from ..models import Comment, Follow, Group, Post, User
+from ..paginators import CursorPaginator
 
 User = get_user_model()
 SYMBOLS_AMOUNT = 15
@@ -78,3 +81,78 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     test_post._meta.get_field(value).help_text, expected)
+
+
+class HotQueryIndexTest(TestCase):
+    """Частые запросы читаются по индексу, без сортировки во временном
+    B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title=test_group_title,
+            slug=test_group_slug,
+            description=test_group_description,
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def test_hot_queries_use_indexes(self):
+        """Ленты, комментарии и подписки используют свои индексы."""
+        hot_queries = {
+            'post_pub_date_idx': Post.objects.all()[:10],
+            'post_author_pub_date_idx': (
+                Post.objects.filter(author=self.author)[:10]
+            ),
+            'post_group_pub_date_idx': (
+                Post.objects.filter(group=self.group)[:10]
+            ),
+            'comment_post_created_idx': Comment.objects.filter(
+                post=self.post
+            ),
+        }
+        for index, queryset in hot_queries.items():
+            with self.subTest(index=index):
+                plan = self.explain(queryset)
+                self.assertIn(index, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_feed_pages_use_feed_index(self):
+        """Страница ленты и страница по курсору читаются по индексу."""
+        feed = feeds.get_feed(self.user)
+        paginator = CursorPaginator(feed, 10)
+        pages = {
+            'first': feed.push[:11],
+            'after': paginator._after(
+                (self.post.pub_date, self.post.pk)
+            ).push[:11],
+        }
+        for page, queryset in pages.items():
+            with self.subTest(page=page):
+                plan = self.explain(queryset)
+                self.assertIn('feed_user_pub_date_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_probe_uses_unique_index(self):
+        """Проверка подписки ищет по уникальному индексу (user, author)."""
+        plan = self.explain(
+            Follow.objects.filter(user=self.user, author=self.author)
+        )
+        self.assertIn('SEARCH', plan)
+        self.assertIn('INDEX', plan)
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на того же автора запрещена."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.user, author=self.author)
@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import fulltext
+from ..models import Comment, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class FullTextSearchTests(QueryBudgetMixin, TestCase):
+    '''Проверка полнотекстового поиска по постам и комментариям'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, term):
+        return list(fulltext.search_posts(term))
+
+    def test_index_follows_writes(self):
+        '''Индекс видит создание, правку и удаление постов.'''
+        post = Post.objects.create(author=self.user, text='Зимний лес')
+        self.assertEqual(self.search('лес'), [post])
+        post.text = 'Летнее море'
+        post.save()
+        self.assertEqual(self.search('лес'), [])
+        self.assertEqual(self.search('море'), [post])
+        Post.objects.filter(pk=post.pk).update(text='Осенний сад')
+        self.assertEqual(self.search('сад'), [post])
+        post.delete()
+        self.assertEqual(self.search('сад'), [])
+
+    def test_prefix_and_all_words(self):
+        '''Слова ищутся по началу, в посте должны быть все слова.'''
+        both = Post.objects.create(author=self.user, text='Горные лыжи')
+        Post.objects.create(author=self.user, text='Горные реки')
+        self.assertEqual(self.search('гор лыж'), [both])
+        self.assertEqual(len(self.search('горн')), 2)
+
+    def test_ranking(self):
+        '''Пост, где слово встречается чаще, выше в выдаче.'''
+        rare = Post.objects.create(
+            author=self.user, text='Кот и много других слов про разное'
+        )
+        often = Post.objects.create(author=self.user, text='Кот кот кот')
+        self.assertEqual(self.search('кот'), [often, rare])
+
+    def test_query_syntax_is_escaped(self):
+        '''Операторы FTS5 из ввода не ломают запрос.'''
+        post = Post.objects.create(author=self.user, text='NOT AND OR')
+        self.assertEqual(self.search('"NOT" AND*'), [post])
+        self.assertEqual(self.search('!!! ***'), [])
+
+    def test_search_page(self):
+        '''Страница поиска показывает найденное и помнит запрос.'''
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Поиск номер {number}')
+            for number in range(12)
+        )
+        Post.objects.create(author=self.user, text='Совсем другое')
+        url = reverse('posts:search')
+        response = self.assertWithinQueryBudget(
+            self.client, url, {'q': 'поиск'}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 12)
+        self.assertContains(
+            response, 'href="?q=%D0%BF%D0%BE%D0%B8%D1%81%D0%BA&amp;page=2"'
+        )
+        response = self.client.get(url, {'q': 'поиск', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 2)
+        response = self.client.get(url)
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_admin_search(self):
+        '''Поиск в админке идет по индексу постов и комментариев.'''
+        post = Post.objects.create(author=self.user, text='Закат над рекой')
+        Post.objects.create(author=self.user, text='Рассвет')
+        Comment.objects.create(
+            post=post, author=self.user, text='Красивый закат'
+        )
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'закат'}
+        )
+        self.assertEqual(list(response.context['cl'].result_list), [post])
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'красив'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_benchmark_command(self):
+        '''Замер поиска работает на маленьком корпусе.'''
+        out = StringIO()
+        call_command('benchmark_search', posts=200, repeat=1, stdout=out)
+        self.assertIn('Индексация: 200 постов', out.getvalue())
+        self.assertIn('LIKE', out.getvalue())
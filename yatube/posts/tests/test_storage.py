@@ -0,0 +1,64 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Post, StoredImage
+from ..storage import is_sharded, shard_name
+from .test_thumbnails import make_image
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def run_on_commit(func):
+    func()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ShardedStorageTests(TestCase):
+    '''Проверка раскладки картинок по подкаталогам'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_upload_goes_to_hashed_subdirectory(self):
+        '''Новая картинка сохраняется в posts/xx/yy/.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image()
+        )
+        self.assertTrue(post.image.name.startswith('posts/'))
+        self.assertTrue(is_sharded(post.image.name))
+        self.assertTrue(default_storage.exists(post.image.name))
+
+    @mock.patch('posts.dedup.transaction', mock.Mock(on_commit=run_on_commit))
+    def test_shard_media_command_moves_flat_files(self):
+        '''shard_media переносит старые файлы и переписывает пути.'''
+        name = default_storage.save('posts/old.jpg', make_image())
+        post = Post.objects.create(author=self.user, text='Пост', image=name)
+        StoredImage.objects.create(sha256='0' * 64, name=name)
+        call_command('shard_media', batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, shard_name(name))
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertFalse(default_storage.exists(name))
+        self.assertTrue(
+            StoredImage.objects.filter(name=post.image.name).exists()
+        )
+        out = StringIO()
+        call_command('shard_media', stdout=out)
+        self.assertIn('перенесено 0', out.getvalue())
@@ -0,0 +1,180 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name='photo.jpg', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'navy').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPregenerationTests(TestCase):
+    '''Проверка фонового создания миниатюр'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnails.lru.clear()
+        self.post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image()
+        )
+
+    def test_original_is_shown_until_thumbnail_exists(self):
+        '''Пока миниатюры нет, шаблон получает оригинал картинки.'''
+        self.assertEqual(
+            thumbnails.post_thumbnail(self.post),
+            (self.post.image.url, 1200, 800)
+        )
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_generated_thumbnail_is_used(self):
+        '''Созданная заранее миниатюра берется из хранилища sorl.'''
+        thumbnails.submit(self.post.image.name)
+        thumbnail = thumbnails.post_thumbnail(self.post)
+        self.assertNotEqual(thumbnail.url, self.post.image.url)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+
+    def test_thumbnails_are_submitted_to_process_pool(self):
+        '''Создание миниатюр отдается пулу процессов один раз.'''
+        executor = mock.Mock()
+        with mock.patch.object(
+            thumbnails, 'get_executor', return_value=executor
+        ):
+            thumbnails.submit(self.post.image.name)
+            thumbnails.submit(self.post.image.name)
+        executor.submit.assert_called_once_with(
+            thumbnails.generate_thumbnails, self.post.image.name
+        )
+        thumbnails._pending.clear()
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_srcset_lists_generated_widths(self):
+        '''srcset перечисляет все созданные варианты card.'''
+        self.assertEqual(thumbnails.post_srcset(self.post), '')
+        thumbnails.submit(self.post.image.name)
+        srcset = thumbnails.post_srcset(self.post)
+        widths = [item.split()[1] for item in srcset.split(', ')]
+        self.assertEqual(widths, ['360w', '540w', '720w', '960w'])
+
+    def test_bandwidth_report_command(self):
+        '''Команда bandwidth_report печатает итоговую экономию.'''
+        out = StringIO()
+        call_command('bandwidth_report', images=1, stdout=out)
+        self.assertIn('Итого', out.getvalue())
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_page_thumbnails_are_resolved_in_one_batch(self):
+        '''Миниатюры страницы ищутся одним запросом, затем в памяти.'''
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user, text=f'Пост {i}',
+                image=make_image(size=(1200, 801 + i))
+            )
+            for i in range(2)
+        ]
+        for post in posts:
+            thumbnails.submit(post.image.name)
+        cache.clear()
+        thumbnails.lru.clear()
+        with CaptureQueriesContext(connection) as context:
+            thumbnails.prefetch_thumbnails(posts, ['card'])
+        self.assertEqual(len(context.captured_queries), 1)
+        for post in posts:
+            self.assertEqual(
+                thumbnails.post_thumbnail(post).width, 960
+            )
+        with CaptureQueriesContext(connection) as context:
+            thumbnails.prefetch_thumbnails(posts, ['card'])
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(
+            thumbnails.thumbnail_stats(),
+            {'lru': 3, 'cache': 0, 'db': 3, 'miss': 0}
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailCollectionTests(TestCase):
+    '''Проверка сборки мусора в миниатюрах'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnails.lru.clear()
+        self.post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image()
+        )
+        thumbnails.submit(self.post.image.name)
+        self.card = thumbnails.post_thumbnail(self.post)
+
+    def collect(self, **options):
+        out = StringIO()
+        call_command(
+            'collect_thumbnails', grace=0, restart=True, stdout=out,
+            **options
+        )
+        return out.getvalue()
+
+    def test_thumbnails_of_deleted_post_are_removed(self):
+        '''Миниатюры картинки без постов удаляются, dry run их оставляет.'''
+        self.post.delete()
+        self.assertIn('Будет удалено: миниатюр 4', self.collect(dry_run=True))
+        self.assertTrue(default_storage.exists(self.card.name))
+        self.assertIn('Удалено: миниатюр 4', self.collect())
+        self.assertFalse(default_storage.exists(self.card.name))
+
+    @override_settings(THUMBNAIL_SRCSET_WIDTHS=(480,))
+    def test_stale_geometries_and_stray_files_are_removed(self):
+        '''Лишние размеры и незнакомые sorl файлы удаляются.'''
+        stray = default_storage.save('cache/ab/cd/stray.jpg', make_image())
+        self.assertIn('миниатюр 3', self.collect())
+        self.assertTrue(default_storage.exists(self.card.name))
+        self.assertFalse(default_storage.exists(stray))
+
+    def test_time_budget_resumes_from_cursor(self):
+        '''С бюджетом времени запуск останавливается и продолжается.'''
+        self.post.delete()
+        out = self.collect(time_budget=0, batch_size=1)
+        self.assertIn('Остановлено на sources', out)
+        out = StringIO()
+        call_command('collect_thumbnails', grace=0, stdout=out)
+        self.assertIn('Проход завершен', out.getvalue())
+        self.assertFalse(default_storage.exists(self.card.name))
@@ -0,0 +1,126 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import uploads
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+# Тег EXIF Orientation: 6 - повернуть на 90 градусов по часовой
+ORIENTATION = 0x0112
+
+
+def make_upload(name, size, format_='JPEG', mode='RGB', orientation=None):
+    buffer = BytesIO()
+    image = Image.new(mode, size, 'navy')
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION] = orientation
+    image.save(buffer, format_, exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    IMAGE_UPLOAD_MAX_SIZE=400,
+    IMAGE_UPLOAD_FORMAT='JPEG'
+)
+class UploadPipelineTests(TestCase):
+    '''Проверка обработки картинок при загрузке'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_image_is_rotated_downsized_and_stripped(self):
+        '''Картинка поворачивается по EXIF, уменьшается и теряет EXIF.'''
+        upload = make_upload('photo.jpg', (1200, 800), orientation=6)
+        content, width, height = uploads.process_image(upload)
+        image = Image.open(BytesIO(content))
+        self.assertEqual((width, height), (267, 400))
+        self.assertEqual(image.size, (267, 400))
+        self.assertNotIn(ORIENTATION, image.getexif())
+
+    def test_transparent_png_is_stored_as_webp_or_jpeg(self):
+        '''Прозрачный PNG пересжимается в выбранный формат.'''
+        for format_ in uploads.UPLOAD_FORMATS:
+            with self.subTest(format_=format_):
+                upload = make_upload('logo.png', (100, 50), 'PNG', 'RGBA')
+                content, _, _ = uploads.process_image(upload, format_=format_)
+                self.assertEqual(Image.open(BytesIO(content)).format, format_)
+
+    @override_settings(IMAGE_UPLOAD_FORMAT='WEBP')
+    def test_post_create_stores_processed_image(self):
+        '''post_create сохраняет уже обработанную картинку.'''
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': make_upload('photo.jpg', (1200, 800))
+        })
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertTrue(post.image.name.endswith('/photo.webp'))
+        self.assertEqual((post.image.width, post.image.height), (400, 267))
+
+    def test_benchmark_uploads_command(self):
+        '''Команда benchmark_uploads печатает итоговое сравнение.'''
+        path = f'{TEMP_MEDIA_ROOT}/sample.jpg'
+        with open(path, 'wb') as file_:
+            file_.write(make_upload('sample.jpg', (1200, 800)).read())
+        out = StringIO()
+        call_command('benchmark_uploads', path, stdout=out)
+        self.assertIn('Итого', out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageSizeTests(TestCase):
+    '''Проверка сохраненных размеров картинки поста'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    def test_size_is_saved_and_rendered(self):
+        '''Размеры пишутся при сохранении и выводятся в <img>.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост',
+            image=make_upload('photo.jpg', (300, 200))
+        )
+        self.assertEqual(
+            (post.image_width, post.image_height, post.image_format),
+            (300, 200, 'JPEG')
+        )
+        cache.clear()
+        response = Client().get(reverse('posts:homepage'))
+        self.assertContains(response, 'width="300" height="200"')
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_backfill_image_sizes_command(self):
+        '''backfill_image_sizes заполняет размеры старых постов.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост',
+            image=make_upload('photo.jpg', (300, 200))
+        )
+        Post.objects.update(image_width=None, image_height=None)
+        call_command('backfill_image_sizes', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (300, 200))
@@ -60,6 +60,8 @@ class PostsURLTests(TestCase):
         }
 
     def setUp(self):
+        # Списки постов кэшируются, сбрасываем кэш между тестами
+        cache.clear()
         # Создаем неавторизованный клиент
         self.guest_client = Client()
         # Создаем авторизованый клиент
@@ -1,16 +1,28 @@
+import base64
 import shutil
 import tempfile
+import time
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.core.paginator import Page
+from django.core.management import call_command
+from django.core.paginator import Page, Paginator
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
+from .. import counters, paginators, thumbnails, views
 from ..models import Comment, Follow, Group, Post
+from .test_thumbnails import make_image
+from .utils import QueryBudgetMixin
 
 User = get_user_model()
 
@@ -90,6 +102,8 @@ class PostsViewsTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        # Списки постов кэшируются, сбрасываем кэш между тестами
+        cache.clear()
         # Создаем неавторизованный клиент
         self.guest_client = Client()
         # Создаем авторизованый клиент
@@ -283,12 +297,12 @@ class PostsViewsTests(TestCase):
 
     def test_cache_index(self):
         '''Проверка хранения и очищения кэша для Главной страницы.'''
+        # Страница с недоделанными миниатюрами в кэш не попадает
+        thumbnails.generate_thumbnails(self.post.image.name)
         response = self.authorized_client.get(reverse('posts:homepage'))
         posts = response.content
-        Post.objects.create(
-            text='test_new_post',
-            author=self.user,
-        )
+        # update() не отправляет сигналы, поэтому кэш не сбрасывается
+        Post.objects.filter(pk=self.post.pk).update(text='test_new_text')
         response_old = self.authorized_client.get(reverse('posts:homepage'))
         old_posts = response_old.content
         self.assertEqual(old_posts, posts)
@@ -297,6 +311,53 @@ class PostsViewsTests(TestCase):
         new_posts = response_new.content
         self.assertNotEqual(old_posts, new_posts)
 
+    def test_cache_listings_invalidated_by_new_post(self):
+        '''Новый пост сразу виден на закэшированных страницах.'''
+        urls = (
+            reverse('posts:homepage'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse(
+                'posts:profile',
+                kwargs={'username': PostsViewsTests.user.username}
+            ),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        Post.objects.create(
+            text='test_new_post',
+            author=PostsViewsTests.user,
+            group=self.group,
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'test_new_post')
+
+    def test_cache_profile_invalidated_by_follow(self):
+        '''Подписка сбрасывает кэш профиля автора.'''
+        url = reverse(
+            'posts:profile', kwargs={'username': PostsViewsTests.user}
+        )
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Подписчиков: 0')
+        self.assertContains(response, 'Подписаться')
+        Follow.objects.create(user=self.user, author=PostsViewsTests.user)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Отписаться')
+
+    def test_cache_follower_profile_invalidated_by_follow(self):
+        '''Подписка сбрасывает кэш и ETag профиля подписчика.'''
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'подписок: 0')
+        Follow.objects.create(user=self.user, author=PostsViewsTests.user)
+        response = self.authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'подписок: 1')
+
 
 class PostsPaginatorViewsTest(TestCase):
     @classmethod
@@ -321,8 +382,12 @@ class PostsPaginatorViewsTest(TestCase):
                                    )
                               )
         Post.objects.bulk_create(test_posts)
+        # bulk_create не отправляет сигналы, пересчитываем счетчики
+        counters.reconcile_users([cls.user.pk])
 
     def setUp(self):
+        # Списки постов кэшируются, сбрасываем кэш между тестами
+        cache.clear()
         # Создаем неавторизованный клиент
         self.guest_client = Client()
         # Авторизованый клиент - автор тестовых постов
@@ -393,6 +458,113 @@ class PostsPaginatorViewsTest(TestCase):
         )
 
 
+class PageWindowTest(TestCase):
+    '''Проверка окна номеров страниц в навигации'''
+
+    def window(self, number, pages):
+        page = Paginator(range(pages * 10), 10).page(number)
+        return paginators.page_window(page)
+
+    def test_window_around_current_page(self):
+        '''Выводятся края, соседние страницы и пропуски.'''
+        self.assertEqual(
+            self.window(50, 100), [1, None, 48, 49, 50, 51, 52, None, 100]
+        )
+        self.assertEqual(self.window(1, 100), [1, 2, 3, None, 100])
+        self.assertEqual(self.window(4, 100), [1, 2, 3, 4, 5, 6, None, 100])
+        self.assertEqual(self.window(2, 3), [1, 2, 3])
+
+    def test_rendered_size_does_not_grow_with_pages(self):
+        '''Навигация по 5000 страницам не длиннее, чем по 100.'''
+        sizes = []
+        for pages in (100, 5000):
+            page = Paginator(range(pages * 10), 10).page(pages // 2)
+            html = render_to_string('posts/includes/paginator.html', {
+                'page_obj': page, 'numbered': True
+            })
+            self.assertLessEqual(html.count('<li'), 13)
+            sizes.append(len(html))
+        self.assertLess(sizes[1] - sizes[0], 100)
+
+
+class PostsCursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Тестовый пост {i}', group=cls.group)
+            for i in range(13)
+        )
+        counters.reconcile_users([cls.user.pk])
+        cls.urls = (
+            reverse('posts:homepage'),
+            reverse('posts:group_posts', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_after_cursor_returns_next_slice(self):
+        '''Курсор ?after= отдает те же посты, что и вторая страница.'''
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-pk'
+        ).values_list('pk', flat=True)[10:])
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url).context['page_obj']
+                cache.clear()
+                page = self.guest_client.get(
+                    url, {'after': paginators.next_cursor(first)}
+                ).context['page_obj']
+                self.assertIsInstance(page, paginators.CursorPage)
+                self.assertEqual([post.pk for post in page], expected)
+                self.assertFalse(page.has_next())
+                self.assertTrue(page.has_previous())
+
+    def test_before_cursor_returns_previous_slice(self):
+        '''Курсор ?before= возвращает к первой странице.'''
+        first = self.guest_client.get(self.urls[0]).context['page_obj']
+        cache.clear()
+        second = self.guest_client.get(
+            self.urls[0], {'after': paginators.next_cursor(first)}
+        ).context['page_obj']
+        cache.clear()
+        back = self.guest_client.get(
+            self.urls[0], {'before': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_cursor_page_does_not_count(self):
+        '''Курсорная страница строится одним запросом без COUNT(*).'''
+        paginator = paginators.CursorPaginator(Post.objects.all(), 10)
+        cursor = paginator.encode_cursor(Post.objects.all()[4])
+        with self.assertNumQueries(1) as context:
+            page = paginator.get_page(after=cursor)
+        self.assertEqual(len(page), 8)
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'])
+
+    def test_broken_cursor_returns_first_page(self):
+        '''Испорченный курсор приводит к первой странице.'''
+        response = self.guest_client.get(self.urls[0], {'after': '!!!'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+        # Правильный base64, но вместо даты мусор
+        cursor = base64.urlsafe_b64encode(b'notadate|5').decode()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, {'after': cursor})
+                self.assertEqual(len(response.context['page_obj']), 10)
+
+
 class PostAdditionalCheck(TestCase):
     '''Проверка создания поста на главной, в профиле и в группе'''
     @classmethod
@@ -416,6 +588,8 @@ class PostAdditionalCheck(TestCase):
         )
 
     def setUp(self):
+        # Списки постов кэшируются, сбрасываем кэш между тестами
+        cache.clear()
         # Создаем неавторизованный клиент
         self.guest_client = Client()
         # Создаем авторизованый клиент
@@ -516,6 +690,8 @@ class FollowViewsTests(TestCase):
         cls.ZERO_POSTS = 0
 
     def setUp(self):
+        # Списки постов кэшируются, сбрасываем кэш между тестами
+        cache.clear()
         # Создаем неавторизованный клиент
         self.guest_client = Client()
         # Создаем авторизованый клиент (будет подписан на author)
@@ -649,3 +825,373 @@ class FollowViewsTests(TestCase):
             len(response.context['page_obj']),
             self.ZERO_POSTS
         )
+
+
+class ListingQueryCountTests(TestCase):
+    '''Число запросов страницы не зависит от числа постов на ней'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.author = User.objects.create_user(username='test_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = cls.create_post(0)
+        cls.urls = (
+            reverse('posts:homepage'),
+            reverse('posts:group_posts', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'test_author'}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    @classmethod
+    def create_post(cls, number):
+        post = Post.objects.create(
+            author=cls.author, group=cls.group, text=f'Пост {number}'
+        )
+        commenter = User.objects.create_user(username=f'commenter_{number}')
+        Comment.objects.create(
+            post=cls.post if number else post,
+            author=commenter,
+            text=f'Комментарий {number}'
+        )
+        return post
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return len(context)
+
+    def test_listing_query_count_is_constant(self):
+        '''Страница с одним постом и с десятью стоит одинаково.'''
+        single = {url: self.count_queries(url) for url in self.urls}
+        for number in range(1, 10):
+            self.create_post(number)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), single[url])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, FEED_PULL_THRESHOLD=1)
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    '''Проверка бюджетов запросов на заполненных страницах.
+
+    Часть постов с картинками, у которых еще нет миниатюр, а первый
+    автор с двумя подписчиками читается в ленте pull-потоком.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.authors = [
+            User.objects.create_user(username=f'test_author_{i}')
+            for i in range(3)
+        ]
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group_{i}', description='-'
+            )
+            for i in range(2)
+        ]
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.reader, author=author)
+        Follow.objects.create(user=cls.authors[1], author=cls.authors[0])
+        cls.posts = [
+            Post.objects.create(
+                author=cls.authors[i % 3],
+                group=cls.groups[i % 2],
+                text=f'Тестовый пост {i}',
+                image=make_image() if i % 2 else None
+            )
+            for i in range(15)
+        ]
+        for i in range(5):
+            Comment.objects.create(
+                post=cls.posts[-1],
+                author=cls.authors[i % 3],
+                text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.authors[0])
+
+    def test_read_views_within_budget(self):
+        '''Страницы чтения укладываются в бюджет запросов.'''
+        post = self.posts[-1]
+        urls = (
+            reverse('posts:homepage'),
+            reverse('posts:group_posts', kwargs={'slug': 'group_0'}),
+            reverse('posts:profile', kwargs={'username': 'test_author_0'}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+        for client in (self.guest_client, self.reader_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    cache.clear()
+                    self.assertWithinQueryBudget(client, url)
+        self.assertWithinQueryBudget(
+            self.reader_client, reverse('posts:follow_index')
+        )
+
+    def test_write_views_within_budget(self):
+        '''Запись постов, комментариев и подписок укладывается в бюджет.'''
+        post = self.posts[0]
+        self.assertWithinQueryBudget(
+            self.author_client, reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.groups[0].pk}, 'post'
+        )
+        # Автор с подписчиками: новый пост разносится по лентам
+        push_author_client = Client()
+        push_author_client.force_login(self.authors[1])
+        self.assertWithinQueryBudget(
+            push_author_client, reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'group': self.groups[0].pk,
+             'image': make_image('new.jpg')},
+            'post'
+        )
+        self.assertWithinQueryBudget(
+            self.author_client,
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Новый текст'}, 'post'
+        )
+        self.assertWithinQueryBudget(
+            self.reader_client,
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            {'text': 'Комментарий'}, 'post'
+        )
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                self.assertWithinQueryBudget(
+                    self.reader_client,
+                    reverse(name, kwargs={'username': 'test_author_2'})
+                )
+
+    def test_middleware_logs_exceeded_budget(self):
+        '''Middleware пишет в лог превышение бюджета.'''
+        with mock.patch.object(views.index, 'query_budget', 0):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                self.reader_client.get(reverse('posts:homepage'))
+        self.assertIn('posts:homepage exceeded', logs.output[0])
+
+
+class CommentPaginationTests(QueryBudgetMixin, TestCase):
+    '''Проверка порций комментариев на странице поста'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        for number in range(views.COMMENTS_AMOUNT + 5):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+        cls.newest = list(Comment.objects.filter(post=cls.post))
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_detail_shows_newest_comments(self):
+        '''Страница поста выводит только самые новые комментарии.'''
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            list(comments), self.newest[:views.COMMENTS_AMOUNT]
+        )
+        self.assertContains(response, 'data-more-comments')
+
+    def test_next_batch_fragment(self):
+        '''Фрагмент по курсору отдает следующую порцию без ссылки.'''
+        first = views.get_comments_page(self.post)
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        response = self.assertWithinQueryBudget(
+            self.client, url, {'after': first.next_cursor}
+        )
+        self.assertEqual(
+            list(response.context['comments']),
+            self.newest[views.COMMENTS_AMOUNT:]
+        )
+        self.assertContains(response, 'Комментарий 0')
+        self.assertNotContains(response, 'data-more-comments')
+        self.assertNotContains(response, '<html')
+
+    def test_next_batch_json(self):
+        '''С format=json фрагмент приходит вместе с данными и курсором.'''
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        data = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(len(data['comments']), views.COMMENTS_AMOUNT)
+        self.assertEqual(data['comments'][0]['id'], self.newest[0].pk)
+        self.assertIn('data-more-comments', data['html'])
+        data = self.client.get(
+            url, {'format': 'json', 'after': data['next']}
+        ).json()
+        self.assertEqual(len(data['comments']), 5)
+        self.assertIsNone(data['next'])
+
+
+class SharedPageCacheTests(TestCase):
+    '''Проверка общей копии страницы с фрагментами пользователя'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.reader = User.objects.create_user(username='test_reader')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_one_copy_for_all_visitors(self):
+        '''Главная рисуется один раз, шапка и вкладки у каждого свои.'''
+        url = reverse('posts:homepage')
+        guest = self.guest_client.get(url)
+        self.assertTemplateUsed(guest, 'posts/index.html')
+        self.assertContains(guest, 'Войти')
+        self.assertNotContains(guest, 'Избранные авторы')
+        reader = self.reader_client.get(url)
+        self.assertTemplateNotUsed(reader, 'posts/index.html')
+        self.assertContains(reader, 'Пользователь: test_reader')
+        self.assertContains(reader, 'Избранные авторы')
+        for response in (guest, reader):
+            self.assertNotContains(response, '<!--hole:')
+
+    def test_follow_button_per_user(self):
+        '''Кнопка подписки в общей копии профиля своя у каждого.'''
+        url = reverse('posts:profile', kwargs={'username': 'test_author'})
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+        response = self.guest_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/profile.html')
+        self.assertContains(response, 'Подписаться')
+        response = self.author_client.get(url)
+        self.assertNotContains(response, 'Подписаться')
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_follow_is_checked_once(self):
+        '''Подписка проверяется один раз, и тот в дыре follow_button.'''
+        url = reverse('posts:profile', kwargs={'username': 'test_author'})
+        with CaptureQueriesContext(connection) as context:
+            self.reader_client.get(url)
+        follow_queries = [
+            query for query in context.captured_queries
+            if 'FROM "posts_follow"' in query['sql']
+        ]
+        self.assertEqual(len(follow_queries), 1)
+
+
+class ConditionalGetTests(TestCase):
+    '''Проверка ответов 304 на повторные просмотры'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+        cls.urls = (
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+            reverse('posts:profile', kwargs={'username': 'test_author'}),
+            reverse('posts:group_posts', kwargs={'slug': 'test_slug'}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def revalidate(self, url, etag):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, len(context)
+
+    def test_not_modified_without_rendering(self):
+        '''Неизменная страница отвечает 304 без шаблонов.'''
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertIn('no-cache', first['Cache-Control'])
+                self.assertFalse(first.has_header('Last-Modified'))
+                response, queries = self.revalidate(url, first['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertFalse(response.templates)
+                self.assertLessEqual(queries, 4)
+
+    def test_changes_invalidate_etag(self):
+        '''Новый комментарий и новый пост меняют ETag.'''
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        Comment.objects.create(post=self.post, author=self.reader, text='Ок')
+        Post.objects.create(author=self.author, group=self.group, text='2')
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response, _ = self.revalidate(url, etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_edit_invalidates_post_etag(self):
+        '''Правка текста комментария меняет ETag поста.'''
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Ок'
+        )
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        comment.text = 'Исправленный комментарий'
+        comment.save()
+        response, _ = self.revalidate(url, etag)
+        self.assertContains(response, 'Исправленный комментарий')
+
+    def test_if_modified_since_alone_is_not_trusted(self):
+        '''Правка и удаление поста не дают 304 по If-Modified-Since.'''
+        url = self.urls[2]
+        self.client.get(url)
+        since = http_date(time.time() + 60)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertContains(response, 'Исправленный пост')
+        self.post.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertNotContains(response, 'Исправленный пост')
+
+    def test_etag_depends_on_user(self):
+        '''ETag другого пользователя не подходит: у него своя шапка.'''
+        url = self.urls[1]
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+    def test_benchmark_command(self):
+        '''Замер повторных просмотров показывает ответы 304.'''
+        out = StringIO()
+        call_command('benchmark_conditional', repeat=1, stdout=out)
+        self.assertEqual(out.getvalue().count('ответ 304 0 байт'), 3)
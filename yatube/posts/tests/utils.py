@@ -0,0 +1,25 @@
+from urllib.parse import urlparse
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+class QueryBudgetMixin:
+    '''Проверки бюджета запросов, объявленного декоратором query_budget'''
+
+    def assertWithinQueryBudget(self, client, url, data=None, method='get'):
+        '''Запрос к url укладывается в бюджет своего view.'''
+        view = resolve(urlparse(url).path).func
+        budget = getattr(view, 'query_budget', None)
+        self.assertIsNotNone(
+            budget, f'У view {view.__name__} не объявлен бюджет запросов'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, data)
+        queries = '\n'.join(query['sql'] for query in context)
+        self.assertLessEqual(
+            len(context), budget,
+            f'{url}: {len(context)} запросов при бюджете {budget}\n{queries}'
+        )
+        return response
@@ -0,0 +1,179 @@
+"""Сборка мусора в миниатюрах sorl.
+
+Два прохода, оба потоковые и с курсором, чтобы работу можно было
+прерывать по времени и продолжать со следующего запуска:
+
+1. по записям ||thumbnails|| хранилища ключей: миниатюры картинок,
+   которых больше нет ни у одного поста, и миниатюры геометрий,
+   которые шаблоны больше не выводят;
+2. по файлам каталога THUMBNAIL_PREFIX: файлы, о которых хранилище
+   ключей ничего не знает.
+"""
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .models import Post
+from .thumbnails import backend, thumbnail_specs
+
+SOURCES = 'sources'
+FILES = 'files'
+
+
+class Deadline:
+    """Срок, до которого можно работать; None - без ограничения"""
+
+    def __init__(self, seconds=None):
+        self.at = None if seconds is None else time.monotonic() + seconds
+
+    def passed(self):
+        return self.at is not None and time.monotonic() > self.at
+
+
+def source_batches(after, batch_size):
+    """Пачки ключей картинок, у которых есть миниатюры, по порядку"""
+    prefix = add_prefix('', 'thumbnails')
+    while True:
+        keys = list(KVStoreModel.objects.filter(
+            key__startswith=prefix, key__gt=prefix + after
+        ).order_by('key').values_list('key', flat=True)[:batch_size])
+        if not keys:
+            return
+        yield [del_prefix(key) for key in keys]
+        after = del_prefix(keys[-1])
+
+
+def expected_keys(source):
+    """Ключи миниатюр, которые сейчас выводят шаблоны"""
+    return {
+        backend.thumbnail_file(source, geometry, options).key
+        for geometry, options in thumbnail_specs().values()
+    }
+
+
+def delete_thumbnail(key, dry_run):
+    thumbnail = default.kvstore._get(key)
+    if not dry_run:
+        if thumbnail is not None:
+            thumbnail.delete()
+        default.kvstore._delete(key)
+
+
+def collect_source(key, source, used_names, dry_run):
+    """Чистит миниатюры одной картинки; возвращает число удаленных"""
+    kvstore = default.kvstore
+    thumbnail_keys = kvstore._get(key, identity='thumbnails') or []
+    if source is None or source.name not in used_names:
+        stale = set(thumbnail_keys)
+        keep = []
+    else:
+        keep_keys = expected_keys(source)
+        stale = {thumb for thumb in thumbnail_keys if thumb not in keep_keys}
+        keep = [thumb for thumb in thumbnail_keys if thumb in keep_keys]
+    for thumbnail_key in stale:
+        delete_thumbnail(thumbnail_key, dry_run)
+    if stale and not dry_run:
+        if keep:
+            kvstore._set(key, keep, identity='thumbnails')
+        else:
+            kvstore._delete(key, identity='thumbnails')
+    return len(stale)
+
+
+def collect_sources(keys, dry_run):
+    """Проход по пачке картинок из хранилища ключей"""
+    sources = {key: default.kvstore._get(key) for key in keys}
+    names = [source.name for source in sources.values() if source]
+    used_names = set(Post.objects.filter(
+        image__in=names
+    ).values_list('image', flat=True))
+    return sum(
+        collect_source(key, source, used_names, dry_run)
+        for key, source in sources.items()
+    )
+
+
+def walk_files(storage, path, after=()):
+    """Файлы каталога рекурсивно в порядке имен, начиная после after.
+
+    after - части пути файла, на котором остановился прошлый запуск.
+    """
+    dirs, files = storage.listdir(path)
+    for name in sorted(dirs + files):
+        full_name = f'{path}/{name}'
+        parts = tuple(full_name.split('/'))
+        if name in dirs:
+            if parts >= after[:len(parts)]:
+                yield from walk_files(storage, full_name, after)
+        elif parts > after:
+            yield full_name
+
+
+def collect_files(names, storage, dry_run, grace):
+    """Удаляет файлы миниатюр, которых нет в хранилище ключей.
+
+    Файлы моложе grace не трогаются: их миниатюра может как раз
+    создаваться, а запись в хранилище ключей появляется после файла.
+    """
+    keys = {
+        add_prefix(ImageFile(name, storage).key): name for name in names
+    }
+    known = set(KVStoreModel.objects.filter(
+        key__in=list(keys)
+    ).values_list('key', flat=True))
+    fresh_after = timezone.now() - grace
+    deleted = 0
+    for key, name in keys.items():
+        if key in known or storage.get_modified_time(name) > fresh_after:
+            continue
+        deleted += 1
+        if not dry_run:
+            storage.delete(name)
+    return deleted
+
+
+def file_batches(storage, after, batch_size):
+    root = sorl_settings.THUMBNAIL_PREFIX.rstrip('/')
+    if not storage.exists(root):
+        return
+    after = tuple(after.split('/')) if after else ()
+    batch = []
+    for name in walk_files(storage, root, after):
+        batch.append(name)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def collect(cursor, deadline, batch_size=500, dry_run=False,
+            grace=timedelta(hours=1)):
+    """Один запуск сборки мусора.
+
+    cursor - словарь {'phase', 'after'} с места прошлой остановки.
+    Возвращает (новый курсор или None, если проход завершен, счетчики).
+    """
+    stats = Counter()
+    phase, after = cursor['phase'], cursor['after']
+    if phase == SOURCES:
+        for keys in source_batches(after, batch_size):
+            stats['thumbnails'] += collect_sources(keys, dry_run)
+            stats['sources'] += len(keys)
+            if deadline.passed():
+                return {'phase': SOURCES, 'after': keys[-1]}, stats
+        phase, after = FILES, ''
+    storage = default.storage
+    for names in file_batches(storage, after, batch_size):
+        stats['files'] += collect_files(names, storage, dry_run, grace)
+        stats['scanned'] += len(names)
+        if deadline.passed():
+            return {'phase': FILES, 'after': names[-1]}, stats
+    return None, stats
@@ -0,0 +1,304 @@
+import logging
+import multiprocessing
+import threading
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+
+logger = logging.getLogger(__name__)
+
+# Все миниатюры, которые выводят шаблоны постов: имя -> (геометрия, опции)
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Узкие варианты card для srcset называются card_<ширина>
+SRCSET_BASE = 'card'
+
+# Оригинал картинки, который показывается, пока нет миниатюры. Размеры
+# берутся из полей поста, файл для этого не открывается
+OriginalImage = namedtuple('OriginalImage', 'url width height')
+
+# Хранилище sorl, ключи которого можно читать пакетом
+CACHED_DB_KVSTORE = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'
+
+_executor = None
+# Картинки, миниатюры которых уже ждут своей очереди в пуле
+_pending = set()
+
+
+class CachedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который умеет искать миниатюру, не создавая ее"""
+
+    def thumbnail_file(self, file_, geometry_string, options):
+        """ImageFile миниатюры с теми же опциями, что у get_thumbnail"""
+        source = ImageFile(file_)
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+class ThumbnailLRU:
+    """LRU-кэш найденных миниатюр в памяти процесса со статистикой"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            thumbnail = self.entries.get(key)
+            if thumbnail is not None:
+                self.entries.move_to_end(key)
+            return thumbnail
+
+    def put(self, key, thumbnail):
+        with self.lock:
+            self.entries[key] = thumbnail
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.THUMBNAIL_LRU_SIZE:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.stats.clear()
+
+
+backend = CachedThumbnailBackend()
+lru = ThumbnailLRU()
+
+
+def thumbnail_stats():
+    """Статистика поиска миниатюр: lru, cache, db, miss"""
+    return dict(lru.stats)
+
+
+def _fetch_raw(raw_keys):
+    """Значения хранилища sorl: сначала одним get_many из кэша,
+    остальное одним запросом к таблице хранилища"""
+    # Модели sorl импортируются здесь: рабочий процесс пула загружает
+    # этот модуль раньше, чем django.setup()
+    from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+    from sorl.thumbnail.models import KVStore as KVStoreModel
+
+    store = default.kvstore
+    values = store.cache.get_many(raw_keys)
+    lru.stats['cache'] += sum(
+        value != EMPTY_VALUE for value in values.values()
+    )
+    missing = [key for key in raw_keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        lru.stats['db'] += len(found)
+        store.cache.set_many(
+            {key: found.get(key, EMPTY_VALUE) for key in missing},
+            sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(found)
+    return {
+        key: value for key, value in values.items()
+        if value != EMPTY_VALUE
+    }
+
+
+def thumbnail_specs():
+    """POST_THUMBNAILS и варианты card из THUMBNAIL_SRCSET_WIDTHS"""
+    geometry, options = POST_THUMBNAILS[SRCSET_BASE]
+    width, height = map(int, geometry.split('x'))
+    specs = dict(POST_THUMBNAILS)
+    for srcset_width in settings.THUMBNAIL_SRCSET_WIDTHS:
+        if srcset_width < width:
+            srcset_height = round(height * srcset_width / width)
+            specs[f'{SRCSET_BASE}_{srcset_width}'] = (
+                f'{srcset_width}x{srcset_height}', options
+            )
+    return specs
+
+
+def resolve_thumbnails(images, sizes=('card',)):
+    """Находит готовые миниатюры сразу для нескольких картинок.
+
+    Возвращает словарь (имя картинки, размер) -> ImageFile миниатюры
+    или None, если миниатюры еще нет.
+    """
+    specs = thumbnail_specs()
+    files = {
+        (image.name, size): backend.thumbnail_file(image, *specs[size])
+        for image in images if image
+        for size in sizes
+    }
+    result = {}
+    for item, thumbnail in files.items():
+        result[item] = lru.get(thumbnail.key)
+    lru.stats['lru'] += sum(value is not None for value in result.values())
+    keys = {
+        add_prefix(files[item].key): item
+        for item, value in result.items() if value is None
+    }
+    if not keys:
+        return result
+    if sorl_settings.THUMBNAIL_KVSTORE == CACHED_DB_KVSTORE:
+        raw = _fetch_raw(list(keys))
+        found = {
+            keys[key]: deserialize_image_file(value)
+            for key, value in raw.items()
+        }
+    else:
+        found = {
+            keys[key]: default.kvstore.get(files[keys[key]])
+            for key in keys
+        }
+        found = {item: value for item, value in found.items() if value}
+    lru.stats['miss'] += len(keys) - len(found)
+    for item, thumbnail in found.items():
+        lru.put(files[item].key, thumbnail)
+        result[item] = thumbnail
+    logger.debug('thumbnail lookups: %s', thumbnail_stats())
+    return result
+
+
+def prefetch_thumbnails(posts, sizes=None):
+    """Запоминает в постах их миниатюры, найденные одним пакетом.
+
+    По умолчанию ищутся все размеры, которые выводят шаблоны.
+    """
+    sizes = sizes or list(thumbnail_specs())
+    posts = [post for post in posts if post.image]
+    found = resolve_thumbnails([post.image for post in posts], sizes)
+    for post in posts:
+        post.prefetched_thumbnails = {
+            size: found.get((post.image.name, size)) for size in sizes
+        }
+
+
+def _get_thumbnails(post, sizes):
+    prefetched = getattr(post, 'prefetched_thumbnails', {})
+    missing = [size for size in sizes if size not in prefetched]
+    found = resolve_thumbnails([post.image], missing) if missing else {}
+    return {
+        size: prefetched[size] if size in prefetched
+        else found[(post.image.name, size)]
+        for size in sizes
+    }
+
+
+def thumbnails_ready(post):
+    """Созданы ли все миниатюры картинки поста.
+
+    Пока какой-то нет, шаблон выводит вместо нее оригинал, и такую
+    разметку нельзя надолго кэшировать.
+    """
+    if not post.image:
+        return True
+    return all(_get_thumbnails(post, list(thumbnail_specs())).values())
+
+
+def generate_thumbnails(name):
+    """Создает все миниатюры thumbnail_specs() для картинки name"""
+    for geometry, options in thumbnail_specs().values():
+        try:
+            get_thumbnail(name, geometry, **options)
+        except Exception:
+            logger.exception('Не удалось создать миниатюру %s', name)
+
+
+def _init_worker():
+    # Рабочий процесс запускается через spawn и настраивает Django сам
+    import django
+    django.setup()
+
+
+def get_executor():
+    """Пул процессов для миниатюр, создается при первой задаче"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker
+        )
+    return _executor
+
+
+def submit(name):
+    """Отдает картинку в пул; возвращает Future или None"""
+    if not settings.THUMBNAIL_WORKERS:
+        generate_thumbnails(name)
+        return None
+    if name in _pending:
+        return None
+    _pending.add(name)
+    future = get_executor().submit(generate_thumbnails, name)
+    future.add_done_callback(lambda future: _pending.discard(name))
+    return future
+
+
+def enqueue(name):
+    """Ставит создание миниатюр в очередь после коммита транзакции"""
+    if settings.THUMBNAIL_PREGENERATE:
+        transaction.on_commit(lambda: submit(name))
+
+
+def post_thumbnail(post, size='card'):
+    """Миниатюра картинки поста, если она уже создана.
+
+    Пока миниатюры нет, возвращается OriginalImage: шаблон покажет его,
+    а создание миниатюры уходит в пул процессов. Без предварительного
+    создания миниатюра делается прямо в запросе, как в теге thumbnail.
+    Миниатюры, найденные prefetch_thumbnails, повторно не ищутся.
+    """
+    image = post.image
+    if not image:
+        return None
+    cached = _get_thumbnails(post, [size])[size]
+    if cached is not None:
+        return cached
+    geometry, options = thumbnail_specs()[size]
+    if not settings.THUMBNAIL_PREGENERATE:
+        return get_thumbnail(image, geometry, **options)
+    enqueue(image.name)
+    return OriginalImage(image.url, post.image_width, post.image_height)
+
+
+def post_srcset(post):
+    """Значение srcset из готовых вариантов card, от узкого к широкому.
+
+    Недостающие варианты создаются так же, как в post_thumbnail:
+    в пуле процессов или, без предварительного создания, сразу.
+    """
+    if not post.image:
+        return ''
+    specs = thumbnail_specs()
+    sizes = [size for size in specs if size.startswith(SRCSET_BASE)]
+    found = _get_thumbnails(post, sizes)
+    missing = [size for size, thumbnail in found.items() if not thumbnail]
+    if missing and settings.THUMBNAIL_PREGENERATE:
+        enqueue(post.image.name)
+    elif missing:
+        for size in missing:
+            geometry, options = specs[size]
+            found[size] = get_thumbnail(post.image, geometry, **options)
+    candidates = sorted(
+        (thumbnail.width, thumbnail.url)
+        for thumbnail in found.values() if thumbnail
+    )
+    return ', '.join(f'{url} {width}w' for width, url in candidates)
@@ -0,0 +1,90 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+# Формат хранения загруженных картинок: расширение, MIME-тип, опции save()
+UPLOAD_FORMATS = {
+    'JPEG': ('.jpg', 'image/jpeg', {
+        'quality': 85, 'optimize': True, 'progressive': True
+    }),
+    'WEBP': ('.webp', 'image/webp', {'quality': 80, 'method': 4}),
+}
+
+
+def open_image(file_, max_size):
+    """Открывает картинку, декодируя JPEG сразу в уменьшенном масштабе.
+
+    draft() просит декодер JPEG отдать картинку в 1/2, 1/4 или 1/8
+    размера, поэтому полноразмерный растр в памяти не появляется.
+    """
+    file_.seek(0)
+    image = Image.open(file_)
+    if image.format == 'JPEG':
+        image.draft('RGB', (max_size, max_size))
+    return image
+
+
+def normalize_mode(image, format_):
+    """Приводит режим к тому, что умеет формат; прозрачность для JPEG
+    заливается белым"""
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if not has_alpha:
+        return image.convert('RGB')
+    image = image.convert('RGBA')
+    if format_ != 'JPEG':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def process_image(file_, max_size=None, format_=None):
+    """Готовит загруженную картинку к хранению.
+
+    Поворачивает по EXIF, уменьшает до max_size по большей стороне,
+    выбрасывает метаданные и пересжимает в format_. Возвращает
+    (содержимое, ширина, высота). Анимации не трогаются: None.
+    """
+    max_size = max_size or settings.IMAGE_UPLOAD_MAX_SIZE
+    format_ = format_ or settings.IMAGE_UPLOAD_FORMAT
+    image = open_image(file_, max_size)
+    if getattr(image, 'is_animated', False):
+        return None
+    image = ImageOps.exif_transpose(image)
+    # thumbnail() сначала уменьшает через reduce(), потом сглаживает
+    image.thumbnail((max_size, max_size), Image.LANCZOS, reducing_gap=2.0)
+    image = normalize_mode(image, format_)
+    buffer = BytesIO()
+    image.save(buffer, format_, **UPLOAD_FORMATS[format_][2])
+    return buffer.getvalue(), image.width, image.height
+
+
+def image_info(storage, name):
+    """Ширина, высота и формат по заголовку файла картинки.
+
+    Image.open читает только заголовок, сам растр не декодируется.
+    Для отсутствующего или битого файла возвращается (None, None, '').
+    """
+    try:
+        with storage.open(name) as file_, Image.open(file_) as image:
+            return image.width, image.height, image.format or ''
+    except (OSError, ValueError, SuspiciousFileOperation):
+        return None, None, ''
+
+
+def process_upload(uploaded):
+    """Загруженный файл после process_image или он сам для анимаций"""
+    format_ = settings.IMAGE_UPLOAD_FORMAT
+    processed = process_image(uploaded, format_=format_)
+    if processed is None:
+        uploaded.seek(0)
+        return uploaded
+    extension, content_type, _ = UPLOAD_FORMATS[format_]
+    stem = os.path.splitext(os.path.basename(uploaded.name))[0]
+    return SimpleUploadedFile(stem + extension, processed[0], content_type)
@@ -11,6 +11,8 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     # Профайл пользователя
     path('profile/<str:username>/', views.profile, name='profile'),
+    # Поиск по записям
+    path('search/', views.search, name='search'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     # Новая запись
@@ -19,6 +21,11 @@ urlpatterns = [
     path('posts/<int:post_id>/edit/',
          views.post_edit, name='post_edit'
          ),
+    # Следующая порция комментариев
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'
+         ),
     # Добавление комментария
     path('posts/<int:post_id>/comment/',
          views.add_comment,
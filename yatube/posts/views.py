@@ -1,74 +1,187 @@
+from functools import partial
+
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+
+from core import holes
+from core.decorators import query_budget
 
+from . import conditional, counters, feeds, fulltext
+from .caching import author_scope, cache_listing, group_scope, index_scope
 from .forms import CommentForm, PostForm
 from .models import Comment, Follow, Group, Post, User
+from .paginators import CountedPaginator, CursorPaginator
 
 POSTS_AMOUNT = 10
+COMMENTS_AMOUNT = 20
 
 
-def get_page_obj(queryset, request):
-    """Создание Paginator с нужным queryset"""
-    paginator = Paginator(queryset, POSTS_AMOUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def get_page_obj(queryset, request, count=None):
+    """Создание Paginator с нужным queryset
+
+    Если в запросе есть курсор ?after= или ?before=, страница строится
+    keyset-паджинатором без COUNT(*) и OFFSET. Известное заранее
+    количество записей count (число или функция, например значение
+    счетчика или закэшированный COUNT(*)) избавляет от запроса COUNT(*).
+    Карточки и миниатюры постов страницы достает тег post_cards.
+    """
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        page_obj = CursorPaginator(queryset, POSTS_AMOUNT).get_page(
+            after=after, before=before
+        )
+    else:
+        paginator = CountedPaginator(queryset, POSTS_AMOUNT, count)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
     return page_obj
 
 
-@cache_page(20 * 15)
+def get_comments_page(post, after=None):
+    """Порция комментариев поста, самые новые первыми.
+
+    Keyset-паджинатор по (created, id) читает не больше
+    COMMENTS_AMOUNT + 1 строк, сколько бы комментариев ни было.
+    """
+    comments = Comment.objects.for_listing().filter(post=post)
+    return CursorPaginator(comments, COMMENTS_AMOUNT, key='created').get_page(
+        after=after
+    )
+
+
+@query_budget(5)
+@cache_listing(index_scope)
 def index(request):
     """Главная страница"""
+    posts = Post.objects.for_listing()
+    count = partial(counters.cached_count, index_scope(), posts)
     context = {
-        'page_obj': get_page_obj(Post.objects.all(), request)
+        'page_obj': get_page_obj(posts, request, count)
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(5)
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.listing_etag(group_scope))
+@cache_listing(group_scope)
 def group_posts(request, slug):
     """Получение постов нужной группы по запросу"""
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_listing()
+    count = partial(counters.cached_count, group_scope(slug), posts)
     context = {
         'group': group,
-        'page_obj': get_page_obj(posts, request)
+        'page_obj': get_page_obj(posts, request, count)
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(6)
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.listing_etag(author_scope))
+@cache_listing(author_scope)
 def profile(request, username):
     """Отображение профиля пользователя"""
     # Код запроса к модели User
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    post_quantity = author.posts.count()
-    following = (request.user.is_authenticated
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    stats = counters.get_stats(author)
+    post_list = author.posts.for_listing()
+    post_quantity = stats.posts_count
+    # На общей странице кнопку подписки заполняет дыра follow_button
+    following = (not holes.is_shared(request)
+                 and request.user.is_authenticated
                  and Follow.objects.filter(
                      user=request.user,
                      author=author).exists())
     context = {
         'username': author,
         'post_quantity': post_quantity,
-        'page_obj': get_page_obj(post_list, request),
+        'stats': stats,
+        'page_obj': get_page_obj(post_list, request, post_quantity),
         'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(4)
+def search(request):
+    """Поиск по тексту постов, самые подходящие первыми
+
+    Порядок по релевантности не годится для курсоров по дате,
+    поэтому страницы переключаются только по номерам.
+    """
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = CountedPaginator(
+            fulltext.search_posts(query), POSTS_AMOUNT
+        )
+        page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&'
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(6)
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.post_etag)
 def post_detail(request, post_id):
     """Функция для просмотра поста и комментариев"""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        id=post_id
+    )
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': get_comments_page(post)
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(2)
+@require_safe
+def post_comments(request, post_id):
+    '''Следующая порция комментариев: HTML-фрагмент или JSON'''
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = get_comments_page(post, request.GET.get('after'))
+    context = {
+        'post': post,
+        'comments': comments
+    }
+    template = 'posts/includes/comment_list.html'
+    if request.GET.get('format') != 'json':
+        return render(request, template, context)
+    return JsonResponse({
+        'html': render_to_string(template, context, request),
+        'next': comments.next_cursor if comments.has_next() else None,
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+    })
+
+
+@query_budget(18)
 @login_required
 def post_create(request):
     """Функция создания нового поста"""
@@ -88,6 +201,7 @@ def post_create(request):
     return redirect('posts:profile', user.username)
 
 
+@query_budget(10)
 @login_required
 def post_edit(request, post_id):
     """Функция для редактирования поста"""
@@ -110,6 +224,7 @@ def post_edit(request, post_id):
     return render(request, 'posts/post_create.html', context)
 
 
+@query_budget(8)
 @login_required
 def add_comment(request, post_id):
     '''Добавление комментария'''
@@ -123,22 +238,17 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(8)
 @login_required
 def follow_index(request):
     '''Лента постов от авторов из подписок'''
     context = {
-        'page_obj': get_page_obj(
-            Post.objects.select_related(
-                'author'
-            ).filter(
-                author__following__user=request.user
-            ),
-            request
-        )
+        'page_obj': get_page_obj(feeds.get_feed(request.user), request)
     }
     return render(request, 'posts/follow_index.html', context)
 
 
+@query_budget(14)
 @login_required
 def profile_follow(request, username):
     '''Подписаться на автора'''
@@ -148,9 +258,13 @@ def profile_follow(request, username):
     return redirect('posts:profile', username=username)
 
 
+@query_budget(10)
 @login_required
 def profile_unfollow(request, username):
     '''Отписаться от автора'''
     author = get_object_or_404(User, username=username)
-    Follow.objects.get(user=request.user, author=author).delete()
+    # Сигналы удаления читают имена подписчика и автора
+    Follow.objects.select_related('user', 'author').get(
+        user=request.user, author=author
+    ).delete()
     return redirect('posts:profile', username=username)
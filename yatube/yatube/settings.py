@@ -63,6 +63,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Учет числа SQL-запросов каждого view
+    'core.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -158,3 +160,44 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Загрузки раскладываются по подкаталогам posts/xx/yy/, см. shard_media
+DEFAULT_FILE_STORAGE = 'posts.storage.ShardedStorage'
+# Как core.media.serve_media отдает файлы: sendfile - сам WSGI-сервер,
+# x-accel - nginx по X-Accel-Redirect, x-sendfile - Apache по X-Sendfile
+MEDIA_SERVE_MODE = 'sendfile'
+# internal location nginx, который смотрит в MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Каталоги с неизменяемыми файлами (миниатюры sorl) кэшируются на год
+MEDIA_IMMUTABLE_PREFIXES = ('cache/',)
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+
+# Сколько записей материализованной ленты подписок хранится на пользователя
+FEED_MAX_ENTRIES = 1000
+# Авторам, у которых подписчиков больше порога, посты не разносятся по
+# лентам: follow_index подмешивает их посты при чтении
+FEED_PULL_THRESHOLD = 10000
+# Срок жизни закэшированных страниц со списками постов. Устаревшие страницы
+# сбрасываются сигналами моделей, поэтому срок может быть большим
+LISTING_CACHE_TIMEOUT = 60 * 60 * 24
+# Срок жизни закэшированного числа постов в списках, вместо COUNT(*) на
+# каждый просмотр. Начиная с PAGINATOR_APPROXIMATE_PAGES страниц
+# навигация показывает их число округленно
+LISTING_COUNT_TIMEOUT = 60
+# Срок жизни закэшированной разметки карточки поста. Правка поста сама
+# меняет ключ карточки, срок нужен для имени автора и адреса группы
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+PAGINATOR_APPROXIMATE_PAGES = 1000
+
+# Миниатюры картинок постов создаются пулом процессов после сохранения
+# поста. THUMBNAIL_WORKERS = 0 создает их синхронно
+THUMBNAIL_PREGENERATE = True
+THUMBNAIL_WORKERS = 2
+# Сколько найденных миниатюр держать в памяти процесса
+THUMBNAIL_LRU_SIZE = 1024
+# Ширины вариантов миниатюры card для srcset; шире самой card не бывает
+THUMBNAIL_SRCSET_WIDTHS = (360, 540, 720, 960)
+
+# Загруженные картинки уменьшаются до IMAGE_UPLOAD_MAX_SIZE по большей
+# стороне и хранятся без метаданных в формате JPEG или WEBP
+IMAGE_UPLOAD_MAX_SIZE = 2048
+IMAGE_UPLOAD_FORMAT = 'JPEG'